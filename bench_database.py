@@ -0,0 +1,143 @@
+# bench_database.py
+# Пропускная способность записи в database_sqlite: поштучный commit против пакетных API.
+# База для сравнения — прямое соединение sqlite3 с commit на каждую строку (как было до писателя
+# с групповым commit); сам Database поштучные вызовы уже группирует, это отдельные строки отчёта.
+#   python bench_database.py            -> 2700 монет (типичный батч)
+#   python bench_database.py 20000
+#   python bench_database.py --check    -> проверка порядка записи: код возврата 1, если профиль
+#                                          показывает монету раньше, чем каталог закоммитил её листинги
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from database_sqlite import Database
+
+EXCHANGES = ["Binance", "ByBit", "OKX", "MEXC", "Gate.io", "KuCoin", "BitGet", "HTX", "BingX", "CoinEx"]
+
+
+def _rows(n):
+    rows = []
+    for i in range(n):
+        spot = ", ".join(EXCHANGES[j] for j in range(len(EXCHANGES)) if (i >> j) & 1)
+        futures = ", ".join(EXCHANGES[j] for j in range(0, len(EXCHANGES), 3) if (i >> j) & 1)
+        rows.append((f"COIN{i}", spot, futures))
+    return rows
+
+
+def _per_row_conn(path):
+    """Прямое соединение без писателя: таблица монет как в старой схеме, commit вызывающий делает сам."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coins (
+            name TEXT PRIMARY KEY, spot TEXT, futures TEXT,
+            favorite INTEGER NOT NULL DEFAULT 0, note TEXT NOT NULL DEFAULT ''
+        )
+    """)
+    conn.commit()
+    return conn
+
+
+def _per_row(conn, sql, params):
+    for p in params:
+        conn.execute(sql, p)
+        conn.commit()
+
+
+def _measure(db, title, n, fn):
+    start = time.perf_counter()
+    fn()
+    if db is not None:
+        db.reload_from_file()  # дождаться, пока писатель всё закоммитит
+    dt = time.perf_counter() - start
+    print(f"{title:<44} {dt * 1000:10.1f} мс   {n / dt:12.0f} строк/с")
+    return dt
+
+
+def check_write_order(tmp):
+    """Читаем профиль между коммитами: писатель каталога задержан, запись профиля уже отправлена."""
+    Database.PROFILES_DIR = tmp
+    db = Database("order")
+    gate = threading.Event()
+    db._catalog.submit(lambda conn: gate.wait(10))
+    db.save_coins([("ORDER1", "Binance", "OKX")])
+    time.sleep(0.1)  # писателю профиля хватит, чтобы закоммитить, если он не ждёт каталог
+    seen = []
+    reader = threading.Thread(target=lambda: seen.extend(db.search_coins()))  # без read-your-writes
+    reader.start()
+    reader.join()
+    gate.set()
+    db.reload_from_file()
+    after = db.search_coins()
+    db.close()
+    early = [c.name for c in seen if not c.spot_exchanges]
+    ok = not early and [(c.name, c.spot_exchanges) for c in after] == [("ORDER1", "Binance")]
+    print(f"Порядок записи каталог -> профиль: {'в норме' if ok else 'НАРУШЕН'}"
+          + (f" (без листингов: {', '.join(early)})" if early else ""))
+    return ok
+
+
+def main():
+    if "--check" in sys.argv:
+        tmp = tempfile.mkdtemp(prefix="bench_db_")
+        try:
+            sys.exit(0 if check_write_order(tmp) else 1)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2700
+    rows = _rows(n)
+    names = [r[0] for r in rows]
+
+    tmp = tempfile.mkdtemp(prefix="bench_db_")
+    Database.PROFILES_DIR = tmp
+    try:
+        print(f"Монет: {n}, каталог: {tmp}\n")
+
+        conn = _per_row_conn(os.path.join(tmp, "per_row.db"))
+        base = _measure(None, "upsert, sqlite3 (commit на строку)", n, lambda: _per_row(
+            conn, "INSERT INTO coins(name, spot, futures) VALUES(?, ?, ?) "
+                  "ON CONFLICT(name) DO UPDATE SET spot=excluded.spot, futures=excluded.futures", rows))
+        _measure(None, "favorite, sqlite3 (commit на строку)", n, lambda: _per_row(
+            conn, "UPDATE coins SET favorite=1 WHERE name=?", [(name,) for name in names]))
+        _measure(None, "delete, sqlite3 (commit на строку)", n, lambda: _per_row(
+            conn, "DELETE FROM coins WHERE name=?", [(name,) for name in names]))
+        conn.close()
+
+        db = Database("per_call")
+        _measure(db, "save_coin (поштучно, групповой commit)", n,
+                 lambda: [db.save_coin(*r) for r in rows])
+        _measure(db, "set_favorite (поштучно, групповой commit)", n,
+                 lambda: [db.set_favorite(name, True) for name in names])
+        _measure(db, "delete_coin (поштучно, групповой commit)", n,
+                 lambda: [db.delete_coin(name) for name in names])
+        db.close()
+
+        db = Database("session")
+
+        def _session():
+            with db.write_session():
+                for r in rows:
+                    db.save_coin(*r)
+        _measure(db, "save_coin внутри write_session", n, _session)
+        db.close()
+
+        db = Database("bulk")
+        bulk = _measure(db, "save_coins (одна транзакция)", n, lambda: db.save_coins(rows))
+        _measure(db, "set_favorites (одна транзакция)", n, lambda: db.set_favorites(names, True))
+        _measure(db, "delete_coins (одна транзакция)", n, lambda: db.delete_coins(names))
+        db.close()
+
+        print(f"\nУскорение upsert против commit на строку: x{base / bulk:.1f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
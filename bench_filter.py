@@ -0,0 +1,90 @@
+# bench_filter.py
+# Скорость фильтра монет: SQL (Database.filter_coins) против битового индекса (ExchangeIndex),
+# а также уточнение запроса по прошлому результату и повтор запроса из LRU индекса.
+#   python bench_filter.py            -> 100000 монет, 100 бирж
+#   python bench_filter.py 20000
+
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from database_sqlite import Database
+import exchange_index
+
+EXCHANGES = [f"Exchange{i:03d}" for i in range(100)]
+
+
+def _rows(n, rnd):
+    rows = []
+    for i in range(n):
+        spot = ", ".join(rnd.sample(EXCHANGES, rnd.randint(0, 6)))
+        futures = ", ".join(rnd.sample(EXCHANGES[:30], rnd.randint(0, 3)))
+        rows.append((f"COIN{i}", spot, futures))
+    return rows
+
+
+def _measure(title, fn, repeat=5, before=None):
+    best = None
+    result = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - start
+        best = dt if best is None else min(best, dt)
+    print(f"{title:<46} {best * 1000:9.2f} мс   ({len(result)} монет)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rnd = random.Random(42)
+    tmp = tempfile.mkdtemp(prefix="bench_filter_")
+    Database.PROFILES_DIR = tmp
+    try:
+        db = Database("bench")
+        db.save_coins(_rows(n, rnd))
+        db.reload_from_file()
+
+        start = time.perf_counter()
+        index = db.exchange_index()
+        print(f"Монет: {n}, бирж: {len(EXCHANGES)}, numpy: {'да' if exchange_index.np is not None else 'нет'}")
+        print(f"Построение индекса: {(time.perf_counter() - start) * 1000:.1f} мс\n")
+
+        few = EXCHANGES[:5]
+        cases = [
+            ("любая из 5 бирж", dict(exchanges=few)),
+            ("любая из всех бирж", dict(exchanges=EXCHANGES)),
+            ("эксклюзивно 5 бирж", dict(exchanges=few, match="all", only=True)),
+            ("любая из 5, только фьючерсы", dict(exchanges=few, market="futures")),
+            ("любая из 5, избранные", dict(exchanges=few, favorites_only=True)),
+        ]
+        for title, kwargs in cases:
+            _measure(f"SQL    {title}", lambda: db.filter_coins(**kwargs))
+            _measure(f"индекс {title}", lambda: index.filter(**kwargs), before=index.clear_cache)
+
+        # набор имени по буквам поверх "любая из всех бирж": каждая буква — уточнение прошлого результата
+        print()
+        base = dict(exchanges=EXCHANGES)
+        for prefix in ("C", "CO", "COIN1", "COIN12"):
+            kwargs = dict(base, name_contains=prefix)
+            _measure(f"индекс имя '{prefix}' с нуля", lambda: index.filter(**kwargs), before=index.clear_cache)
+            shorter = dict(base, name_contains=prefix[:-1])
+
+            def warm():
+                index.clear_cache()
+                index.filter(**shorter)
+            _measure(f"индекс имя '{prefix}' уточнением", lambda: index.filter(**kwargs), before=warm)
+        kwargs = dict(base, name_contains="COIN1")
+        index.filter(**kwargs)
+        index.filter(**dict(base, name_contains="COIN12"))
+        _measure("индекс шаг назад к 'COIN1' (LRU)", lambda: index.filter(**kwargs))
+        db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bench_startup.py
+# Холодный старт приложения: время до первого окна и до первой выборки профиля.
+# Каждый прогон — отдельный процесс (честные импорты), профиль готовится заранее во временной папке.
+#   python bench_startup.py            -> 5 прогонов, профиль на 50000 монет
+#   python bench_startup.py 3 100000
+#   python bench_startup.py --check    -> код возврата 1, если медиана первого окна выше цели
+#                                         или при старте загрузилось что-то из main.STARTUP_LAZY_MODULES
+# Без дисплея: QT_QPA_PLATFORM=offscreen python bench_startup.py
+
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXCHANGES = [f"Exchange{i:02d}" for i in range(60)]
+PROFILE = "bench"
+TARGET_FIRST_WINDOW_MS = 400   # цель холодного старта до первого окна (медиана)
+
+
+def _child(profiles_dir):
+    """Один холодный старт: импорт main, окно, открытие профиля. Печатает JSON с отметками (мс от старта)."""
+    t0 = time.perf_counter()
+    sys.path.insert(0, HERE)
+    os.chdir(HERE)  # иконки берутся относительно папки приложения
+    marks = {}
+
+    import main
+    marks["import main"] = time.perf_counter() - t0
+
+    main.Database.PROFILES_DIR = profiles_dir
+    app = main.QApplication(sys.argv[:1])
+    window = main.CryptoApp()
+    window.show()
+    while not window.isVisible():
+        app.processEvents()
+    app.processEvents()
+    marks["первое окно"] = time.perf_counter() - t0
+    loaded = [m for m in main.STARTUP_LAZY_MODULES if m in sys.modules]
+
+    shown = []
+    tab = window.add_profile_tab(PROFILE)
+    tab.coin_model.modelReset.connect(lambda: shown.append(time.perf_counter()))
+    marks["вкладка профиля"] = time.perf_counter() - t0
+    while not shown:
+        app.processEvents()
+        time.sleep(0.001)
+    marks["первая выборка профиля"] = shown[0] - t0
+
+    tab.stop_filter_thread()
+    tab.db.close()
+    print(json.dumps({"marks": {k: round(v * 1000, 1) for k, v in marks.items()}, "loaded": loaded},
+                     ensure_ascii=False))
+
+
+def _prepare(profiles_dir, n):
+    from database_sqlite import Database
+    Database.PROFILES_DIR = profiles_dir
+    rnd = random.Random(42)
+    db = Database(PROFILE)
+    db.save_coins([(f"COIN{i}", ", ".join(rnd.sample(EXCHANGES, rnd.randint(1, 5))),
+                    ", ".join(rnd.sample(EXCHANGES[:20], rnd.randint(0, 2)))) for i in range(n)])
+    db.close()
+
+
+def main():
+    check = "--check" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--check"]
+    runs = int(args[0]) if len(args) > 0 else 5
+    n = int(args[1]) if len(args) > 1 else 50000
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        _prepare(tmp, n)
+        print(f"Профиль: {n} монет, прогонов: {runs}\n")
+        samples, loaded = {}, set()
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", tmp],
+                                 capture_output=True, text=True, encoding="utf-8")
+            lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+            if out.returncode != 0 or not lines:
+                print(out.stderr or out.stdout)
+                sys.exit(1)
+            result = json.loads(lines[-1])
+            loaded.update(result["loaded"])
+            for key, value in result["marks"].items():
+                samples.setdefault(key, []).append(value)
+        for key, values in samples.items():
+            print(f"{key:<28} медиана {statistics.median(values):8.1f} мс   (мин {min(values):.1f}, макс {max(values):.1f})")
+
+        first_window = statistics.median(samples["первое окно"])
+        print(f"\nЦель до первого окна: {TARGET_FIRST_WINDOW_MS} мс — "
+              f"{'в норме' if first_window <= TARGET_FIRST_WINDOW_MS else 'ПРЕВЫШЕНА'}")
+        print(f"Отложенные модули, загруженные до первого окна: {', '.join(sorted(loaded)) or 'нет'}")
+        if check and (first_window > TARGET_FIRST_WINDOW_MS or loaded):
+            sys.exit(1)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        _child(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,327 @@
+# coin_table.py
+# Таблица монет профиля на model/view: вместо виджетов в каждой ячейке —
+# модель над списком Coin, прокси для сортировки по клику на заголовок и делегат,
+# который рисует ⭐, имя, кнопку копирования и MetaScalp прямо в ячейке.
+# Стоимость — только у видимых строк: 50k монет отрисовываются так же быстро, как 50.
+
+from typing import Dict, Iterable, List, Optional
+
+from sortedcontainers import SortedList
+
+from PyQt5.QtCore import (Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QRect, QPoint,
+                          QEvent, pyqtSignal)
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QBrush, QPalette
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionViewItem, QApplication
+
+COL_COIN = 0
+COL_SPOT = 1
+COL_FUTURES = 2
+
+COIN_ROLE = Qt.UserRole + 1        # сам Coin
+SORT_ROLE = Qt.UserRole + 2        # ключ сортировки колонки
+METASCALP_ROLE = Qt.UserRole + 3   # True — разрешено (allowed), False — запрещено
+
+HEADERS = ["Монета", "Спотовые биржи", "Фьючерсные биржи"]
+
+
+class CoinTableModel(QAbstractTableModel):
+    """
+    Строки — монеты фильтра в порядке «избранные сверху, затем по имени».
+    Порядок — два SortedList имён (избранные, остальные), монеты — словарь имя -> Coin:
+    номер строки по имени, вставка, удаление и перенос при смене ⭐ — O(log n), без обхода строк.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._by_name: Dict[str, object] = {}   # имя -> Coin
+        self._fav = SortedList()                # строки 0..len(_fav)-1
+        self._rest = SortedList()               # строки дальше
+        self._metascalp_denied = set()   # имена с выключенным MetaScalp (переживают перефильтрацию)
+
+    # ---------- Qt ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._by_name)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(HEADERS):
+            return HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        coin = self.coin(index.row())
+        if coin is None:
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col == COL_COIN:
+                return coin.name
+            return coin.spot_exchanges if col == COL_SPOT else coin.futures_exchanges
+        if role == Qt.ToolTipRole and col != COL_COIN:
+            return (coin.spot_exchanges if col == COL_SPOT else coin.futures_exchanges) or None
+        if role == COIN_ROLE:
+            return coin
+        if role == SORT_ROLE:
+            if col == COL_COIN:
+                return f"{0 if coin.favorite else 1}_{coin.name}"
+            return coin.spot_exchanges if col == COL_SPOT else coin.futures_exchanges
+        if role == METASCALP_ROLE:
+            return coin.name not in self._metascalp_denied
+        return None
+
+    # ---------- данные ----------
+
+    def set_coins(self, coins: Iterable):
+        self.beginResetModel()
+        by_name, fav, rest = {}, [], []
+        for coin in coins:
+            by_name[coin.name] = coin
+            (fav if coin.favorite else rest).append(coin.name)
+        self._by_name = by_name
+        self._fav, self._rest = SortedList(fav), SortedList(rest)   # из фильтра уже по порядку — сортировка O(n)
+        self.endResetModel()
+
+    def coins(self) -> List:
+        """Монеты в порядке строк модели."""
+        by_name = self._by_name
+        return [by_name[name] for name in self._fav] + [by_name[name] for name in self._rest]
+
+    def coin(self, row: int):
+        nfav = len(self._fav)
+        if 0 <= row < nfav:
+            return self._by_name[self._fav[row]]
+        if nfav <= row < nfav + len(self._rest):
+            return self._by_name[self._rest[row - nfav]]
+        return None
+
+    def row_of(self, name: str) -> Optional[int]:
+        if name not in self._by_name:
+            return None
+        if name in self._fav:
+            return self._fav.index(name)
+        return len(self._fav) + self._rest.index(name)
+
+    def add(self, coin) -> int:
+        """Вставить монету на её место (или обновить строку, если она уже есть). Возвращает строку."""
+        name = coin.name
+        if name in self._by_name:
+            self._by_name[name] = coin
+            return self.set_favorite(name, coin.favorite)
+        if coin.favorite:
+            part, row = self._fav, self._fav.bisect_left(name)
+        else:
+            part, row = self._rest, len(self._fav) + self._rest.bisect_left(name)
+        self.beginInsertRows(QModelIndex(), row, row)
+        part.add(name)
+        self._by_name[name] = coin
+        self.endInsertRows()
+        return row
+
+    def remove_names(self, names: Iterable[str]) -> int:
+        """Убрать строки монет построчно, без сброса модели (выделение и прокрутка остаются)."""
+        removed = 0
+        for name in names:
+            row = self.row_of(name)
+            if row is None:
+                continue
+            self.beginRemoveRows(QModelIndex(), row, row)
+            (self._fav if name in self._fav else self._rest).remove(name)
+            del self._by_name[name]
+            self.endRemoveRows()
+            removed += 1
+        return removed
+
+    def set_favorite(self, name: str, value: bool) -> Optional[int]:
+        """Сменить ⭐ и переставить строку на её место в порядке «избранные сверху». Возвращает новую строку."""
+        row = self.row_of(name)
+        if row is None:
+            return None
+        value = bool(value)
+        self._by_name[name].favorite = value   # Coin общий с индексом БД — он мог уже поменяться
+        was = name in self._fav                # поэтому прежнее состояние берём из модели
+        if value != was:
+            if value:
+                dest = self._fav.bisect_left(name)
+            else:
+                dest = len(self._fav) - 1 + self._rest.bisect_left(name)
+            if dest != row:
+                # beginMoveRows ждёт позицию «перед какой строкой» в исходной нумерации
+                self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), dest + 1 if dest > row else dest)
+            (self._rest if value else self._fav).remove(name)
+            (self._fav if value else self._rest).add(name)
+            if dest != row:
+                self.endMoveRows()
+            row = dest
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+        return row
+
+    def toggle_metascalp(self, name: str) -> bool:
+        if name in self._metascalp_denied:
+            self._metascalp_denied.discard(name)
+        else:
+            self._metascalp_denied.add(name)
+        row = self.row_of(name)
+        if row is not None:
+            idx = self.index(row, COL_COIN)
+            self.dataChanged.emit(idx, idx, [METASCALP_ROLE])
+        return name not in self._metascalp_denied
+
+
+class CoinSortProxy(QSortFilterProxyModel):
+    """
+    Сортировка по клику на заголовок (по SORT_ROLE). Пока пользователь ничего не выбрал,
+    порядок — исходный из модели (уже отсортирован индексом), без лишней сортировки 50k строк.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+    def reset_order(self):
+        self.sort(-1)
+
+    def source_row(self, proxy_row: int) -> int:
+        return self.mapToSource(self.index(proxy_row, 0)).row()
+
+    def proxy_row(self, source_row: int) -> int:
+        return self.mapFromSource(self.sourceModel().index(source_row, 0)).row()
+
+
+class CoinDelegate(QStyledItemDelegate):
+    """Рисует ячейку «Монета»: ⭐ | имя | копировать | MetaScalp, и ловит клики по ним."""
+
+    favoriteToggled = pyqtSignal(str, bool)
+    copyRequested = pyqtSignal(str, QPoint)      # имя, глобальная позиция кнопки
+    metascalpToggled = pyqtSignal(str)
+
+    MARGIN = 8
+    BUTTON = 24
+    ICON = 18
+    SPACING = 6
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._font = QFont("Arial", 10, QFont.Bold)
+        self._metrics = QFontMetrics(self._font)
+        self._star_on = self._star_off = None
+        self._allowed = self._deny = None
+        self._copy_icon = None
+        self._hover_row = None   # строка, над кнопкой копирования которой курсор
+
+    def set_star_icons(self, on, off):
+        self._star_on, self._star_off = on, off
+
+    def set_metascalp_icons(self, allowed, deny):
+        self._allowed, self._deny = allowed, deny
+
+    def set_copy_icon(self, icon):
+        self._copy_icon = icon
+
+    def _rects(self, rect: QRect, name: str):
+        b = self.BUTTON
+        top = rect.top() + (rect.height() - b) // 2
+        x = rect.left() + self.MARGIN
+        star = QRect(x, top, b, b)
+        x += b + self.SPACING
+        name_rect = QRect(x, rect.top(), self._metrics.horizontalAdvance(name), rect.height())
+        x = name_rect.right() + 1 + 8 + self.SPACING
+        copy = QRect(x, top, b, b)
+        x += b + self.SPACING
+        metascalp = QRect(x, top, b, b)
+        return star, name_rect, copy, metascalp
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        if index.column() == COL_COIN:
+            name = index.data(Qt.DisplayRole) or ""
+            width = self.MARGIN * 2 + self.BUTTON * 3 + self.SPACING * 4 + 8 + self._metrics.horizontalAdvance(name)
+            size.setWidth(max(size.width(), width))
+        return size
+
+    def paint(self, painter: QPainter, option, index):
+        if index.column() != COL_COIN:
+            super().paint(painter, option, index)
+            return
+        coin = index.data(COIN_ROLE)
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+
+        star, name_rect, copy, metascalp = self._rects(option.rect, coin.name)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+
+        icon = self._star_on if coin.favorite else self._star_off
+        if icon is not None and not icon.isNull():
+            icon.paint(painter, self._icon_rect(star))
+
+        painter.setFont(self._font)
+        painter.setPen(opt.palette.color(QPalette.Text))
+        painter.drawText(name_rect, Qt.AlignVCenter | Qt.AlignLeft, coin.name)
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QBrush(QColor("#5B4AE9" if self._hover_row == index.row() else "#6A5AF9")))
+        painter.drawEllipse(copy)
+        if self._copy_icon is not None and not self._copy_icon.isNull():
+            self._copy_icon.paint(painter, copy.adjusted(4, 4, -4, -4))
+        else:
+            painter.setPen(QColor("white"))
+            painter.drawText(copy, Qt.AlignCenter, "C")
+
+        allowed = bool(index.data(METASCALP_ROLE))
+        icon = self._allowed if allowed else self._deny
+        if icon is not None and not icon.isNull():
+            icon.paint(painter, self._icon_rect(metascalp))
+        else:
+            painter.setPen(opt.palette.color(QPalette.Text))
+            painter.drawText(metascalp, Qt.AlignCenter, "A" if allowed else "X")
+        painter.restore()
+
+    def _icon_rect(self, button: QRect) -> QRect:
+        pad = (self.BUTTON - self.ICON) // 2
+        return button.adjusted(pad, pad, -pad, -pad)
+
+    def editorEvent(self, event, model, option, index):
+        if index.column() != COL_COIN:
+            return super().editorEvent(event, model, option, index)
+        coin = index.data(COIN_ROLE)
+        if coin is None:
+            return False
+        star, _, copy, metascalp = self._rects(option.rect, coin.name)
+        if event.type() == QEvent.MouseMove:
+            hover_row = index.row() if copy.contains(event.pos()) else None
+            if hover_row != self._hover_row:
+                self._hover_row = hover_row
+                if option.widget is not None:
+                    option.widget.viewport().update()  # перерисуются только видимые строки
+            return False
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            # нажатие по кнопке не должно менять выделение
+            return event.type() == QEvent.MouseButtonPress and any(
+                r.contains(event.pos()) for r in (star, copy, metascalp))
+        pos = event.pos()
+        if star.contains(pos):
+            self.favoriteToggled.emit(coin.name, not coin.favorite)
+            return True
+        if copy.contains(pos):
+            widget = option.widget
+            where = widget.viewport().mapToGlobal(copy.topLeft()) if widget is not None else QPoint()
+            self.copyRequested.emit(coin.name, where)
+            return True
+        if metascalp.contains(pos):
+            self.metascalpToggled.emit(coin.name)
+            return True
+        return False
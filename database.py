@@ -4,6 +4,13 @@ from dataclasses import dataclass
 import shutil
 import threading          # <— добавили
 
+# Изменения дописываются в <профиль>.json.journal (по строке JSON на изменение),
+# а полный <профиль>.json переписывается только при сжатии журнала.
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_COMPACT_MIN = 1000   # сжимаем, когда записей в журнале больше max(этого, числа монет)
+# Поколение: служебная запись {"generation": N} без имени — в снимке и первой строкой журнала.
+# Журнал применяется только к снимку своего поколения (старые файлы без меток — поколение 0).
+GENERATION_KEY = "generation"
 
 
 @dataclass
@@ -14,67 +21,168 @@ class Coin:
     favorite: bool = False  # <— добавили
 
 
+def _coin_item(coin: Coin) -> dict:
+    return {
+        'name': coin.name,
+        'spot_exchanges': coin.spot_exchanges,
+        'futures_exchanges': coin.futures_exchanges,
+        'favorite': getattr(coin, 'favorite', False)
+    }
+
+
+def read_items(filename: str) -> list:
+    """Снимок профиля + журнал поверх него -> список словарей монет (как в старом .json)."""
+    return _read(filename)[0]
+
+
+def _read(filename: str):
+    """(монеты, поколение снимка, записей журнала применено; -1 — журнал от другого поколения)."""
+    items = {}
+    generation = 0
+    if os.path.exists(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for item in data if isinstance(data, list) else []:
+                if isinstance(item, dict) and item.get('name'):
+                    items[item['name']] = item
+                elif isinstance(item, dict) and GENERATION_KEY in item:
+                    generation = item[GENERATION_KEY]
+        except (json.JSONDecodeError, FileNotFoundError):
+            items = {}
+    applied = 0
+    journal = filename + JOURNAL_SUFFIX
+    if os.path.exists(journal):
+        with open(journal, 'r', encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # недописанная последняя строка (сбой посреди записи)
+                if i == 0 and GENERATION_KEY in rec:
+                    if rec[GENERATION_KEY] != generation:
+                        applied = -1  # сбой между заменой снимка и обнулением журнала: он уже в снимке
+                        break
+                    continue
+                if i == 0 and generation:
+                    applied = -1  # журнал без метки к снимку с меткой — не наш
+                    break
+                name = rec.get('name')
+                if not name:
+                    continue
+                if rec.get('op') == 'del':
+                    items.pop(name, None)
+                else:
+                    items[name] = {k: v for k, v in rec.items() if k != 'op'}
+                applied += 1
+    return list(items.values()), generation, applied
+
+
 class Database:
     PROFILES_DIR = "profiles"
 
     def __init__(self, profile_name='default'):
         self.profile_name = profile_name
         self.filename = f"{self.PROFILES_DIR}/{profile_name}.json"
-        self.coins = []
+        self._coins = {}         # имя -> Coin (порядок добавления сохраняется)
+        self._pending = []       # записи журнала, ещё не дописанные в файл
+        self._journal_len = 0    # записей в журнале с последнего сжатия
+        self._generation = 0     # поколение снимка на диске (GENERATION_KEY)
         self._save_timer = None  # <— добавили
         self._save_lock = threading.Lock()
+        self._coins_lock = threading.Lock()  # _compact снимает монеты в потоке таймера, пока GUI их меняет
+        self._pending_lock = threading.Lock()  # _log дописывает в _pending, таймер забирает список целиком
         # Создаем директорию профилей если нужно
         os.makedirs(self.PROFILES_DIR, exist_ok=True)
         self.load()
 
+    @property
+    def coins(self):
+        return list(self._coins.values())
+
+    @property
+    def journal_filename(self):
+        return self.filename + JOURNAL_SUFFIX
+
     def load(self):
-        """Загружает данные из JSON файла"""
-        if os.path.exists(self.filename):
-            try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.coins = [Coin(
-                        name=item.get('name', ''),
-                        spot_exchanges=item.get('spot_exchanges', ''),
-                        futures_exchanges=item.get('futures_exchanges', ''),
-                        favorite=item.get('favorite', False)  # <— дефолт
-                    ) for item in data]
-            except (json.JSONDecodeError, FileNotFoundError):
-                self.coins = []
-        else:
-            self.coins = []
+        """Загружает снимок из JSON файла и применяет поверх него журнал"""
+        self._coins = {}
+        items, self._generation, applied = _read(self.filename)
+        for item in items:
+            self._coins[item['name']] = Coin(
+                name=item['name'],
+                spot_exchanges=item.get('spot_exchanges', ''),
+                futures_exchanges=item.get('futures_exchanges', ''),
+                favorite=item.get('favorite', False)  # <— дефолт
+            )
+        self._pending = []
+        self._journal_len = 0
+        # журнал от прошлой сессии (возможно, с недописанной строкой) или чужого поколения
+        # сворачиваем в снимок, чтобы новые записи не оказались за битой строкой
+        if applied:
+            with self._save_lock:
+                self._compact()
 
     def save(self):
-        """Сохраняет данные в JSON файл"""
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            data = [{
-                'name': coin.name,
-                'spot_exchanges': coin.spot_exchanges,
-                'futures_exchanges': coin.futures_exchanges,
-                'favorite': getattr(coin, 'favorite', False)  # <— сохраняем
-            } for coin in self.coins]
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        """Сохраняет данные в JSON файл (полный снимок, журнал обнуляется)"""
+        with self._save_lock:
+            with self._pending_lock:
+                self._pending = []
+            self._compact()
+
+    def _compact(self):
+        """Снимок всех монет атомарно через временный файл, затем журнал нового поколения (под _save_lock)."""
+        tmp = f"{self.filename}.tmp"
+        generation = self._generation + 1
+        with self._coins_lock:
+            items = [_coin_item(c) for c in self._coins.values()]
+        items.append({GENERATION_KEY: generation})
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.filename)  # атомарно
+        self._generation = generation
+        # сбой до перезаписи журнала не страшен: старый журнал другого поколения load() пропустит
+        self._start_journal()
+
+    def _start_journal(self):
+        with open(self.journal_filename, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({GENERATION_KEY: self._generation}) + '\n')
+        self._journal_len = 0
+
+    def _log(self, record: dict):
+        with self._pending_lock:
+            self._pending.append(record)
+        self._schedule_save()
+
+    def _flush_journal(self):
+        """Дописать накопленные изменения в журнал; при разросшемся журнале — сжать в снимок."""
+        with self._save_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            # первый снимок или разросшийся журнал — переписываем профиль целиком
+            if (not os.path.exists(self.filename)
+                    or self._journal_len + len(pending) > max(JOURNAL_COMPACT_MIN, len(self._coins))):
+                self._compact()
+                return
+            if not os.path.exists(self.journal_filename):
+                self._start_journal()
+            with open(self.journal_filename, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(rec, ensure_ascii=False) + '\n' for rec in pending))
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_len += len(pending)
 
     def _schedule_save(self, delay: float = 0.4):
         """Поставить сохранение на таймер (дебаунс) — чтобы не блокировать UI на каждый чих."""
 
         def _do_save():
-            with self._save_lock:
-                try:
-                    # атомарная запись через временный файл
-                    tmp = f"{self.filename}.tmp"
-                    data = [{
-                        'name': c.name,
-                        'spot_exchanges': c.spot_exchanges,
-                        'futures_exchanges': c.futures_exchanges,
-                        'favorite': getattr(c, 'favorite', False)
-                    } for c in self.coins]
-                    with open(tmp, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=2, ensure_ascii=False)
-                    os.replace(tmp, self.filename)  # атомарно
-                finally:
-                    # снимаем ссылку на таймер
-                    self._save_timer = None
+            try:
+                self._flush_journal()
+            finally:
+                # снимаем ссылку на таймер
+                self._save_timer = None
 
         # перезапускаем таймер, если уже был
         if self._save_timer and self._save_timer.is_alive():
@@ -83,48 +191,57 @@ class Database:
         self._save_timer.daemon = True
         self._save_timer.start()
 
+    def _cancel_timer(self):
+        timer = self._save_timer
+        if timer and timer.is_alive():
+            timer.cancel()
+        self._save_timer = None
+
+    def flush(self):
+        """Сразу дописать отложенные изменения в журнал"""
+        self._cancel_timer()
+        self._flush_journal()
+
     def close(self):
         """Закрывает соединение с базой данных"""
-        # Для JSON базы данных просто очищаем данные
-        self.coins = []
+        # Для JSON базы данных дописываем журнал и очищаем данные
+        self.flush()
+        self._coins = {}
 
     def save_coin(self, name, spot_exchanges, futures_exchanges):
         """Сохраняет или обновляет данные о монете"""
-        # Ищем монету в базе
-        existing_coin = None
-        for coin in self.coins:
-            if coin.name == name:
-                existing_coin = coin
-                break
-
-        if existing_coin:
-            # Обновляем существующую монету
-            existing_coin.spot_exchanges = spot_exchanges
-            existing_coin.futures_exchanges = futures_exchanges
-        else:
-            # Добавляем новую монету
-            self.coins.append(Coin(name, spot_exchanges, futures_exchanges))
-
-        # Сохраняем изменения в файл
-        self._schedule_save()
+        with self._coins_lock:
+            coin = self._coins.get(name)
+            if coin:
+                # Обновляем существующую монету
+                coin.spot_exchanges = spot_exchanges
+                coin.futures_exchanges = futures_exchanges
+            else:
+                # Добавляем новую монету
+                coin = self._coins[name] = Coin(name, spot_exchanges, futures_exchanges)
+            item = _coin_item(coin)
+
+        # В журнал — только изменённая монета
+        self._log(dict(op='put', **item))
 
     def set_favorite(self, name: str, value: bool):
         """Установить/снять признак избранного у монеты и сохранить файл"""
-        for coin in self.coins:
-            if coin.name == name:
-                coin.favorite = bool(value)
-                self._schedule_save()
-                return True
-        return False
+        with self._coins_lock:
+            coin = self._coins.get(name)
+            if coin is None:
+                return False
+            coin.favorite = bool(value)
+            item = _coin_item(coin)
+        self._log(dict(op='put', **item))
+        return True
 
     def delete_coin(self, name: str):
         """Удалить монету из базы навсегда"""
-        before = len(self.coins)
-        self.coins = [c for c in self.coins if c.name != name]
-        if len(self.coins) != before:
-            self._schedule_save()
-            return True
-        return False
+        with self._coins_lock:
+            if self._coins.pop(name, None) is None:
+                return False
+        self._log({'op': 'del', 'name': name})
+        return True
 
     def search_coins(self):
         """Возвращает все монеты из базы"""
@@ -132,14 +249,20 @@ class Database:
 
     def reload_from_file(self):
         """Перезагружает данные из файла"""
+        self.flush()
         self.load()
 
     def delete_profile(self):
         """Удаляет файл профиля"""
         try:
+            self._cancel_timer()
+            with self._pending_lock:
+                self._pending = []
+            if os.path.exists(self.journal_filename):
+                os.remove(self.journal_filename)
             if os.path.exists(self.filename):
                 os.remove(self.filename)
-                self.coins = []
+                self._coins = {}
                 return True
             return False
         except Exception as e:
@@ -149,7 +272,9 @@ class Database:
         """Копирует текущий профиль в новый"""
         new_filename = f"{self.PROFILES_DIR}/{new_profile_name}.json"
         try:
-            if os.path.exists(self.filename):
+            self.flush()
+            if os.path.exists(self.filename) or os.path.exists(self.journal_filename):
+                self.save()  # в копию — один снимок без журнала
                 shutil.copyfile(self.filename, new_filename)
             return Database(new_profile_name)
         except Exception as e:
@@ -164,9 +289,12 @@ class Database:
         new_path = os.path.join(os.path.dirname(old_path), f"{new_name}.json")
 
         try:
-            # Переименовываем файл
+            # Переименовываем файл (вместе с журналом)
+            self.flush()
             if os.path.exists(old_path):
                 os.rename(old_path, new_path)
+                if os.path.exists(old_path + JOURNAL_SUFFIX):
+                    os.rename(old_path + JOURNAL_SUFFIX, new_path + JOURNAL_SUFFIX)
                 self.filename = new_path
                 self.profile_name = new_name
                 return self
@@ -1,11 +1,45 @@
 # database_sqlite.py
+import logging
 import os
-import shutil
+import queue
 import sqlite3
-from dataclasses import dataclass
-from typing import List
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-@dataclass
+logger = logging.getLogger('Database')
+
+# Писатель группирует всё, что пришло за это окно, в одну транзакцию (один fsync)
+WRITER_GROUP_COMMIT_MS = 5
+WRITER_MAX_BATCH = 1000
+
+# обслуживание WAL и свободных страниц — в потоке писателя, между записями
+WAL_CHECKPOINT_EVERY_S = 1.0            # PASSIVE после записей, не чаще; читателей не ждёт
+WAL_TRUNCATE_BYTES = 16 * 1024 * 1024   # простаивающий писатель обрезает WAL, если он больше...
+WAL_TRUNCATE_EVERY_S = 300              # ...или если с последнего TRUNCATE прошло столько
+MAINTENANCE_TICK_S = 5                  # столько без записей — писатель считается простаивающим
+VACUUM_FREE_PAGES = 1024                # incremental_vacuum, если свободных страниц больше
+VACUUM_STEP_PAGES = 1024
+
+# онлайн-копия профиля: страниц за шаг backup API (между шагами — прогресс)
+BACKUP_PAGES_PER_STEP = 1024
+SNAPSHOTS_DIRNAME = ".snapshots"
+SNAPSHOTS_KEEP = 10
+
+# перенос профиля в общий каталог: с этого размера индекс листингов пересоздаётся после вставки
+MERGE_BULK_ROWS = 5000
+
+MARKET_SPOT = "spot"
+MARKET_FUTURES = "futures"
+
+LISTED = 1
+DELISTED = -1
+
+@dataclass(slots=True)
 class Coin:
     name: str
     spot_exchanges: str
@@ -13,6 +47,589 @@ class Coin:
     favorite: bool = False
     note: str = ""  # <— примечание
 
+
+@dataclass(slots=True)
+class WalStats:
+    wal_bytes: int = 0          # размер файла -wal сейчас
+    checkpoints: int = 0
+    last_mode: str = ""         # PASSIVE / TRUNCATE
+    last_ms: float = 0.0
+    last_frames: int = 0        # кадров WAL перенесено в базу последним чекпоинтом
+    max_ms: float = 0.0
+    vacuumed_pages: int = 0
+
+
+@dataclass(slots=True)
+class ListingChange:
+    ts: int                # unix time
+    coin: str
+    exchange: str
+    market_type: str       # MARKET_SPOT / MARKET_FUTURES
+    change: int            # LISTED / DELISTED
+
+
+def split_exchanges(text: str) -> List[str]:
+    """'Binance, OKX, Binance' -> ['Binance', 'OKX'] (порядок сохраняется)."""
+    if not text:
+        return []
+    return list(dict.fromkeys(e.strip() for e in text.split(',') if e.strip()))
+
+
+def _connect(path: str, readonly: bool = False) -> sqlite3.Connection:
+    # isolation_level=None: транзакциями управляем сами (BEGIN/SAVEPOINT/COMMIT в писателе)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout=5000;")
+    if not readonly:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")  # действует только на новый (пустой) файл
+        conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA mmap_size=134217728;")  # 128MB mmap
+    if readonly:
+        conn.execute("PRAGMA query_only=ON;")
+    return conn
+
+
+def _run_migrations(conn, label: str, migrations):
+    """
+    migrations: [(версия, описание, fn(conn)), ...]. Версия — PRAGMA user_version,
+    каждая миграция применяется одной транзакцией, время пишется в schema_migrations и в лог.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    latest = migrations[-1][0]
+    if version > latest:
+        logger.warning(f"{label}: версия схемы {version} новее поддерживаемой {latest}")
+        return
+    for target, title, fn in migrations:
+        if target <= version:
+            continue
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fn(conn)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    applied_at INTEGER NOT NULL,
+                    duration_ms REAL NOT NULL
+                )
+            """)
+            duration_ms = (time.perf_counter() - start) * 1000
+            conn.execute("INSERT OR REPLACE INTO schema_migrations VALUES(?, ?, ?, ?)",
+                         (target, title, int(time.time()), duration_ms))
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"{label}: миграция {target} ({title}) — {duration_ms:.0f} мс")
+
+
+class _WriteIntent:
+    __slots__ = ("fn", "future", "seq", "in_tx")
+
+    def __init__(self, fn, future, seq, in_tx):
+        self.fn = fn
+        self.future = future
+        self.seq = seq
+        self.in_tx = in_tx
+
+
+class DatabaseWriter:
+    """
+    Единственный пишущий поток профиля. Владеет write-соединением и разбирает очередь
+    намерений записи: всё, что пришло за WRITER_GROUP_COMMIT_MS, коммитится одной транзакцией.
+    Каждое намерение — в своём SAVEPOINT, так что ошибка одного не откатывает соседей.
+    Между записями писатель обслуживает файл: PASSIVE-чекпоинты после записей, TRUNCATE и
+    incremental_vacuum при простое (см. WAL_* / VACUUM_*), статистика — stats().
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._queue = queue.Queue()
+        self._seq_lock = threading.Lock()
+        self._submitted = 0
+        self._committed = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = WalStats()
+        self._stats_lock = threading.Lock()
+        self._last_passive = time.monotonic()
+        self._last_truncate = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name=f"db-writer:{os.path.basename(filename)}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, fn, in_tx: bool = True) -> Future:
+        """fn(conn) выполнится в потоке писателя. in_tx=False — вне транзакции (PRAGMA, VACUUM)."""
+        future = Future()
+        with self._seq_lock:
+            if self._closed:
+                raise RuntimeError("Писатель базы данных уже закрыт")
+            self._submitted += 1
+            future.seq = self._submitted
+            self._queue.put(_WriteIntent(fn, future, self._submitted, in_tx))
+        return future
+
+    def wait_for(self, seq: int, timeout=None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._committed >= seq, timeout)
+
+    def flush(self, timeout=None) -> bool:
+        """Дождаться, пока закоммитится всё, что уже поставлено в очередь."""
+        with self._seq_lock:
+            seq = self._submitted
+        return self.wait_for(seq, timeout)
+
+    def close(self, timeout=None):
+        with self._seq_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> WalStats:
+        with self._stats_lock:
+            stats = replace(self._stats)
+        stats.wal_bytes = self._wal_bytes()
+        return stats
+
+    def _wal_bytes(self) -> int:
+        try:
+            return os.path.getsize(self.filename + "-wal")
+        except OSError:
+            return 0
+
+    def _run(self):
+        conn = _connect(self.filename)
+        try:
+            stop = False
+            while not stop:
+                try:
+                    item = self._queue.get(timeout=MAINTENANCE_TICK_S)
+                except queue.Empty:
+                    self._maintain(conn, idle=True)
+                    continue
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + WRITER_GROUP_COMMIT_MS / 1000.0
+                while len(batch) < WRITER_MAX_BATCH:
+                    # одиночную запись коммитим сразу; окно ждём, только если записи идут потоком
+                    remaining = deadline - time.monotonic() if len(batch) > 1 else 0
+                    try:
+                        nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        stop = True
+                        break
+                    batch.append(nxt)
+                try:
+                    self._apply(conn, batch)
+                except Exception as e:
+                    # писатель не должен умирать молча: иначе flush()/wait_for() ждут вечно
+                    conn = self._recover(conn, batch, e)
+                self._maintain(conn, idle=False)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _recover(self, conn, batch, error):
+        """Пакет упал вне SAVEPOINT'ов: откатываем, проваливаем все его намерения, при нужде переоткрываем соединение."""
+        logger.error(f"Писатель {self.filename}: пакет из {len(batch)} записей не применён: {error}")
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        except Exception as e:
+            logger.error(f"Писатель {self.filename}: соединение переоткрыто после ошибки отката: {e}")
+            try:
+                conn.close()
+            except Exception:
+                pass
+            conn = _connect(self.filename)
+        for intent in batch:
+            if not intent.future.done():
+                intent.future.set_exception(error)
+        with self._cond:
+            self._committed = batch[-1].seq
+            self._cond.notify_all()
+        return conn
+
+    def _maintain(self, conn, idle: bool):
+        """Чекпоинт/вакуум по политике. Ошибки только логируем: обслуживание не должно ронять писателя."""
+        now = time.monotonic()
+        try:
+            if not idle:
+                if now - self._last_passive >= WAL_CHECKPOINT_EVERY_S:
+                    self.checkpoint(conn, "PASSIVE")
+                return
+            wal = self._wal_bytes()
+            if wal >= WAL_TRUNCATE_BYTES or (wal and now - self._last_truncate >= WAL_TRUNCATE_EVERY_S):
+                self.checkpoint(conn, "TRUNCATE")
+            self._vacuum(conn)
+        except Exception as e:
+            logger.error(f"Обслуживание {self.filename}: {e}")
+
+    def checkpoint(self, conn, mode: str = "PASSIVE"):
+        """Вызывается только в потоке писателя (или через submit(..., in_tx=False))."""
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Неизвестный режим чекпоинта: {mode}")
+        wal = self._wal_bytes()
+        start = time.perf_counter()
+        busy, log_frames, done_frames = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        ms = (time.perf_counter() - start) * 1000
+        self._last_passive = time.monotonic()
+        if mode == "TRUNCATE" and not busy:
+            self._last_truncate = self._last_passive
+        with self._stats_lock:
+            st = self._stats
+            st.checkpoints += 1
+            st.last_mode, st.last_ms, st.last_frames = mode, ms, max(done_frames, 0)
+            st.max_ms = max(st.max_ms, ms)
+        if mode == "TRUNCATE" or ms >= 100:
+            # после TRUNCATE SQLite возвращает счётчики кадров уже обнулённого WAL — показываем размер
+            frames = f", кадров {max(done_frames, 0)}/{max(log_frames, 0)}" if mode != "TRUNCATE" else ""
+            logger.info(f"{os.path.basename(self.filename)}: checkpoint {mode}, WAL {wal / 1048576:.1f} МБ"
+                        f"{frames}, {ms:.0f} мс" + (" (заняты читателями)" if busy else ""))
+
+    def _vacuum(self, conn):
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free < VACUUM_FREE_PAGES:
+            return
+        start = time.perf_counter()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # файл создан до auto_vacuum=INCREMENTAL: один полный VACUUM переводит его в этот режим
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+            pages = free
+        else:
+            # через execute модуль sqlite3 делает один шаг (= одна страница); executescript — до конца
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+            pages = free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        with self._stats_lock:
+            self._stats.vacuumed_pages += pages
+        logger.info(f"{os.path.basename(self.filename)}: vacuum, освобождено страниц {pages}, "
+                    f"{(time.perf_counter() - start) * 1000:.0f} мс")
+
+    def _apply(self, conn, batch):
+        done = []      # (intent, result, error) — отдаём только после COMMIT
+        pending = []
+        in_tx = False
+
+        def _commit():
+            nonlocal in_tx, pending
+            try:
+                conn.execute("COMMIT")
+                done.extend(pending)
+            except Exception as e:
+                try:
+                    conn.execute("ROLLBACK")
+                except Exception:
+                    pass
+                done.extend((intent, None, e) for intent, _, _ in pending)
+            pending = []
+            in_tx = False
+
+        for intent in batch:
+            if not intent.in_tx:
+                if in_tx:
+                    _commit()
+                try:
+                    done.append((intent, intent.fn(conn), None))
+                except Exception as e:
+                    done.append((intent, None, e))
+                continue
+
+            try:
+                if not in_tx:
+                    conn.execute("BEGIN IMMEDIATE")
+                    in_tx = True
+                conn.execute("SAVEPOINT intent")
+            except Exception as e:
+                done.append((intent, None, e))
+                continue
+            try:
+                result = intent.fn(conn)
+                conn.execute("RELEASE intent")
+                pending.append((intent, result, None))
+            except Exception as e:
+                try:
+                    conn.execute("ROLLBACK TO intent")
+                    conn.execute("RELEASE intent")
+                    pending.append((intent, None, e))
+                except Exception as rollback_error:
+                    # транзакции уже нет (SQLite откатил её сам: диск полон, busy...) — соседи тоже не записаны
+                    try:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                    except Exception:
+                        pass
+                    done.extend((i, None, rollback_error) for i, _, _ in pending)
+                    done.append((intent, None, e))
+                    pending = []
+                    in_tx = False
+        if in_tx:
+            _commit()
+
+        for intent, result, error in done:
+            if intent.future.done():  # отменён вызывающим
+                continue
+            if error is not None:
+                logger.error(f"Ошибка записи в {self.filename}: {error}")
+                intent.future.set_exception(error)
+            else:
+                intent.future.set_result(result)
+        with self._cond:
+            self._committed = batch[-1].seq
+            self._cond.notify_all()
+
+
+class Catalog:
+    """
+    Общий для всех профилей каталог листингов: profiles/.catalog/catalog.db.
+    Профиль хранит только состав, избранное и заметки и читает spot/futures отсюда
+    (ATTACH ... AS cat), поэтому скан монеты в одной вкладке обновляет её во всех профилях.
+    Один каталог (и один писатель) на папку профилей в процессе: Catalog.for_dir().
+    """
+    DIRNAME = ".catalog"
+    FILENAME = "catalog.db"
+
+    _instances: Dict[str, "Catalog"] = {}
+    _instances_lock = threading.Lock()
+
+    _MIGRATIONS = (
+        (1, "листинги монет", "_migration_listings"),
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()   # последний seq записи потока (read-your-writes для всех профилей)
+        self._profiles = weakref.WeakSet()
+        self._profiles_lock = threading.Lock()
+        self.writer = DatabaseWriter(path)
+        self.writer.submit(self._migrate, in_tx=False).result()
+
+    @classmethod
+    def for_dir(cls, profiles_dir: str) -> "Catalog":
+        folder = os.path.join(profiles_dir, cls.DIRNAME)
+        path = os.path.abspath(os.path.join(folder, cls.FILENAME))
+        with cls._instances_lock:
+            catalog = cls._instances.get(path)
+            if catalog is None:
+                os.makedirs(folder, exist_ok=True)
+                catalog = cls._instances[path] = cls(path)
+            return catalog
+
+    def _migrate(self, conn):
+        _run_migrations(conn, "Каталог", [(v, title, getattr(self, method)) for v, title, method in self._MIGRATIONS])
+
+    def _migration_listings(self, conn):
+        # spot/futures — для отображения, фильтры по биржам работают по coin_listings;
+        # first_seen — у активного листинга, last_seen — когда скан последний раз подтвердил монету
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS coins (
+                name TEXT PRIMARY KEY,
+                spot TEXT NOT NULL DEFAULT '',
+                futures TEXT NOT NULL DEFAULT '',
+                last_seen INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS exchanges (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS coin_listings (
+                coin TEXT NOT NULL,
+                exchange_id INTEGER NOT NULL,
+                market_type TEXT NOT NULL,
+                first_seen INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (coin, exchange_id, market_type)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_listings_exchange ON coin_listings(exchange_id, market_type, coin);"
+        )
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_history (
+                id INTEGER PRIMARY KEY,
+                ts INTEGER NOT NULL,
+                coin TEXT NOT NULL,
+                exchange_id INTEGER NOT NULL,
+                market_type TEXT NOT NULL,
+                change INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_ts ON listing_history(ts);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_coin ON listing_history(coin, ts);")
+
+    # ---------- профили ----------
+
+    def register(self, db: "Database"):
+        with self._profiles_lock:
+            self._profiles.add(db)
+
+    def unregister(self, db: "Database"):
+        with self._profiles_lock:
+            self._profiles.discard(db)
+
+    def notify(self, source: Optional["Database"], rows: List[Tuple[str, str, str]]):
+        """Монеты [(name, spot, futures), ...] изменились — остальные открытые профили обновляют свои индексы."""
+        with self._profiles_lock:
+            profiles = [db for db in self._profiles if db is not source]
+        for db in profiles:
+            db._on_catalog_update(rows)
+
+    # ---------- запись (в потоке писателя каталога) ----------
+
+    def submit(self, fn):
+        future = self.writer.submit(fn)
+        self._local.last_seq = future.seq
+        return future
+
+    def wait_own_writes(self):
+        seq = getattr(self._local, "last_seq", None)
+        if seq is not None:
+            self.writer.wait_for(seq)
+
+    def flush(self):
+        self.writer.flush()
+
+    _UPSERT_SQL = """
+        INSERT INTO coins(name, spot, futures, last_seen)
+        VALUES(?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            spot=excluded.spot,
+            futures=excluded.futures,
+            last_seen=excluded.last_seen
+    """
+
+    def _current(self, conn, names: List[str]) -> Dict[str, Tuple[str, str, int]]:
+        current = {}
+        names = list(set(names))
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            current.update((n, (sp, fu, ts)) for n, sp, fu, ts in conn.execute(
+                f"SELECT name, spot, futures, last_seen FROM coins WHERE name IN ({marks})", chunk))
+        return current
+
+    def _exchange_ids(self, conn, names: Iterable[str]) -> Dict[str, int]:
+        names = list(set(names))
+        conn.executemany("INSERT OR IGNORE INTO exchanges(name) VALUES(?)", [(n,) for n in names])
+        ids = {}
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            ids.update((n, eid) for eid, n in conn.execute(
+                f"SELECT id, name FROM exchanges WHERE name IN ({marks})", chunk))
+        return ids
+
+    def upsert_rows(self, conn, rows: List[Tuple[str, str, str]]):
+        """Upsert монет + листинги; листинги трогаем только у монет, где spot/futures изменились."""
+        now = int(time.time())
+        current = {n: (sp, fu) for n, (sp, fu, _) in self._current(conn, [r[0] for r in rows]).items()}
+        changed = [r for r in rows if current.get(r[0]) != (r[1], r[2])]
+        conn.executemany(self._UPSERT_SQL, [(n, sp, fu, now) for n, sp, fu in rows])
+        if changed:
+            # первое появление монеты в каталоге — не листинг, в историю не пишем
+            self._sync_listings(conn, changed, quiet={r[0] for r in changed if r[0] not in current}, now=now)
+
+    def _sync_listings(self, conn, rows: List[Tuple[str, str, str]], quiet=(), now: int = None):
+        """
+        Привести coin_listings к [(name, spot, futures), ...] (выполняется в писателе).
+        Изменения пишутся в listing_history, кроме монет из quiet.
+        """
+        if not rows:
+            return
+        now = int(time.time()) if now is None else now
+        old = {}
+        names = list({r[0] for r in rows})
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for coin, eid, market in conn.execute(
+                    f"SELECT coin, exchange_id, market_type FROM coin_listings WHERE coin IN ({marks})", chunk):
+                old.setdefault(coin, set()).add((eid, market))
+
+        parsed = [
+            (name, market, ex)
+            for name, spot, futures in rows
+            for market, text in ((MARKET_SPOT, spot), (MARKET_FUTURES, futures))
+            for ex in split_exchanges(text)
+        ]
+        ids = self._exchange_ids(conn, (ex for _, _, ex in parsed)) if parsed else {}
+        new = {}
+        for name, market, ex in parsed:
+            new.setdefault(name, set()).add((ids[ex], market))
+
+        added, removed, history = [], [], []
+        for name in dict.fromkeys(r[0] for r in rows):
+            was, now_set = old.get(name, set()), new.get(name, set())
+            for eid, market in now_set - was:
+                added.append((name, eid, market, now))
+                if name not in quiet:
+                    history.append((now, name, eid, market, LISTED))
+            for eid, market in was - now_set:
+                removed.append((name, eid, market))
+                if name not in quiet:
+                    history.append((now, name, eid, market, DELISTED))
+        if removed:
+            conn.executemany(
+                "DELETE FROM coin_listings WHERE coin=? AND exchange_id=? AND market_type=?", removed)
+        if added:
+            added.sort()  # в порядке первичного ключа — вставки в B-дерево без лишних разбиений
+            conn.executemany(
+                "INSERT OR IGNORE INTO coin_listings(coin, exchange_id, market_type, first_seen) VALUES(?, ?, ?, ?)",
+                added)
+        if history:
+            conn.executemany(
+                "INSERT INTO listing_history(ts, coin, exchange_id, market_type, change) VALUES(?, ?, ?, ?, ?)",
+                history)
+
+    def merge(self, conn, rows: List[Tuple[str, str, str, int]], history=()) -> List[Tuple[str, str, str]]:
+        """
+        Перенос монет из профиля старой схемы или из экспорта: [(name, spot, futures, last_seen), ...].
+        Монета заменяется, только если в каталоге её нет или она там старее; история — без дублей.
+        Возвращает принятые строки (name, spot, futures).
+        """
+        latest = {}
+        for r in rows:  # дубли монеты: берём самую свежую строку
+            if r[0] not in latest or (r[3] or 0) >= (latest[r[0]][3] or 0):
+                latest[r[0]] = r
+        rows = list(latest.values())
+        current = self._current(conn, [r[0] for r in rows])
+        newer = [r for r in rows if r[0] not in current or (r[3] or 0) > current[r[0]][2]]
+        if newer:
+            newer.sort()
+            conn.executemany(self._UPSERT_SQL, [(n, sp or "", fu or "", ts or 0) for n, sp, fu, ts in newer])
+            bulk = len(newer) >= MERGE_BULK_ROWS
+            if bulk:  # пакетная загрузка: вторичный индекс строим один раз после вставки
+                conn.execute("DROP INDEX IF EXISTS idx_listings_exchange")
+            self._sync_listings(conn, [(n, sp or "", fu or "") for n, sp, fu, _ in newer],
+                                quiet={r[0] for r in newer})
+            if bulk:
+                conn.execute("CREATE INDEX idx_listings_exchange ON coin_listings(exchange_id, market_type, coin)")
+        history = list(history)
+        if history:
+            ids = self._exchange_ids(conn, (r[2] for r in history))
+            conn.executemany("""
+                INSERT INTO listing_history(ts, coin, exchange_id, market_type, change)
+                SELECT ?1, ?2, ?3, ?4, ?5 WHERE NOT EXISTS (
+                    SELECT 1 FROM listing_history
+                    WHERE coin = ?2 AND ts = ?1 AND exchange_id = ?3 AND market_type = ?4 AND change = ?5)
+            """, [(ts, coin, ids[ex], market, change) for ts, coin, ex, market, change in history])
+        return [(n, sp or "", fu or "") for n, sp, fu, _ in newer]
+
+
 class Database:
     PROFILES_DIR = "profiles"
 
@@ -20,37 +637,38 @@ class Database:
         self.profile_name = profile_name
         os.makedirs(self.PROFILES_DIR, exist_ok=True)
         self.filename = os.path.join(self.PROFILES_DIR, f"{profile_name}.db")
-        self._conn = sqlite3.connect(self.filename, check_same_thread=False)
-        self._conn.execute("PRAGMA journal_mode=WAL;")
-        self._conn.execute("PRAGMA synchronous=NORMAL;")
-        self._conn.execute("PRAGMA temp_store=MEMORY;")
-        self._conn.execute("PRAGMA mmap_size=134217728;")  # 128MB mmap
-        self._ensure_schema()
-
-        # миграция из json если раньше был json файл
-        legacy_json = os.path.join(self.PROFILES_DIR, f"{profile_name}.json")
-        if os.path.exists(legacy_json) and self._is_table_empty():
-            try:
-                import json
-                with open(legacy_json, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                for item in data:
-                    self.save_coin(
-                        item.get("name", ""),
-                        item.get("spot_exchanges", ""),
-                        item.get("futures_exchanges", "")
-                    )
-                    fav = bool(item.get("favorite", False))
-                    if fav:
-                        self.set_favorite(item.get("name",""), True)
-                    note = item.get("note", "")
-                    if note:
-                        self.set_note(item.get("name",""), note)
-            except Exception:
-                pass
+        self._local = threading.local()   # read-соединение, последний seq и write_session потока
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._generation = 0
+        self._writer = None
+        self._index = None                # ExchangeIndex, строится по первому запросу
+        self._index_lock = threading.RLock()
+        self._catalog = Catalog.for_dir(self.PROFILES_DIR)
+        self.catalog_version = 0          # растёт, когда монеты профиля обновил другой профиль
+        self._open()
+        self._write(self._migrate, wait=True, in_tx=False)
+        self._absorb_catalog_import()
+
+    # ---------- схема ----------
 
-    def _ensure_schema(self):
-        self._conn.execute("""
+    # (версия, описание, метод). Версия профиля — PRAGMA user_version, каждая миграция
+    # применяется одной транзакцией. Миграции идемпотентны: профили до появления версий
+    # (user_version = 0) уже могут содержать часть таблиц.
+    _MIGRATIONS = (
+        (1, "таблица coins", "_migration_coins"),
+        (2, "нормализованные листинги", "_migration_listings"),
+        (3, "история листингов", "_migration_history"),
+        (4, "импорт старого JSON-профиля", "_migration_legacy_json"),
+        (5, "листинги — в общий каталог", "_migration_catalog"),
+    )
+
+    def _migrate(self, conn):
+        _run_migrations(conn, f"Профиль {self.profile_name}",
+                        [(v, title, getattr(self, method)) for v, title, method in self._MIGRATIONS])
+
+    def _migration_coins(self, conn):
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS coins (
                 name TEXT PRIMARY KEY,
                 spot TEXT NOT NULL DEFAULT '',
@@ -59,21 +677,229 @@ class Database:
                 note TEXT NOT NULL DEFAULT ''
             )
         """)
-        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fav ON coins(favorite);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_fav ON coins(favorite);")
+        # самые старые профили — без столбца note
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(coins)")}
+        if "note" not in cols:
+            conn.execute("ALTER TABLE coins ADD COLUMN note TEXT NOT NULL DEFAULT ''")
 
-        # миграция: если старый столбец note отсутствует — добавим
+    def _migration_listings(self, conn):
+        # нормализованные листинги: spot/futures в coins остаются для отображения,
+        # а фильтры по биржам работают по coin_listings
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS exchanges (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS coin_listings (
+                coin TEXT NOT NULL,
+                exchange_id INTEGER NOT NULL,
+                market_type TEXT NOT NULL,
+                PRIMARY KEY (coin, exchange_id, market_type)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_listings_exchange ON coin_listings(exchange_id, market_type, coin);"
+        )
+
+    def _migration_history(self, conn):
+        # история листингов: пишется только при изменении, first_seen — у активного листинга,
+        # last_seen — у монеты (когда скан последний раз подтвердил её листинги)
+        listing_cols = {row[1] for row in conn.execute("PRAGMA table_info(coin_listings)")}
+        if "first_seen" not in listing_cols:
+            conn.execute("ALTER TABLE coin_listings ADD COLUMN first_seen INTEGER NOT NULL DEFAULT 0")
+        coin_cols = {row[1] for row in conn.execute("PRAGMA table_info(coins)")}
+        if "last_seen" not in coin_cols:
+            conn.execute("ALTER TABLE coins ADD COLUMN last_seen INTEGER NOT NULL DEFAULT 0")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_history (
+                id INTEGER PRIMARY KEY,
+                ts INTEGER NOT NULL,
+                coin TEXT NOT NULL,
+                exchange_id INTEGER NOT NULL,
+                market_type TEXT NOT NULL,
+                change INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_ts ON listing_history(ts);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_coin ON listing_history(coin, ts);")
+
+    def _migration_legacy_json(self, conn):
+        """Профиль из старого JSON-бэкенда: одной пакетной вставкой, только если база пустая."""
+        legacy_json = os.path.join(self.PROFILES_DIR, f"{self.profile_name}.json")
+        if not os.path.exists(legacy_json):
+            return
+        if conn.execute("SELECT 1 FROM coins LIMIT 1").fetchone() is not None:
+            return
         try:
-            cols = {row[1] for row in self._conn.execute("PRAGMA table_info(coins)")}
-            if "note" not in cols:
-                self._conn.execute("ALTER TABLE coins ADD COLUMN note TEXT NOT NULL DEFAULT ''")
-        except Exception:
-            pass
+            from database import read_items  # снимок + журнал JSON-бэкенда
+            data = read_items(legacy_json)
+        except Exception as e:
+            logger.error(f"Не удалось прочитать {legacy_json}: {e}")
+            return
+        now = int(time.time())
+        rows = sorted(
+            (item["name"], item.get("spot_exchanges") or "", item.get("futures_exchanges") or "",
+             1 if item.get("favorite") else 0, item.get("note") or "", now)
+            for item in (data if isinstance(data, list) else [])
+            if isinstance(item, dict) and item.get("name")
+        )
+        # листинги построит каталог при переносе (миграция 5)
+        conn.executemany(
+            "INSERT OR IGNORE INTO coins(name, spot, futures, favorite, note, last_seen) VALUES(?, ?, ?, ?, ?, ?)",
+            rows)
 
-        self._conn.commit()
+    def _migration_catalog(self, conn):
+        """
+        Листинги переезжают в общий каталог: в профиле остаются состав, избранное и заметки.
+        Старые spot/futures и история откладываются в catalog_import / catalog_history_import
+        и сливаются в каталог сразу после миграций (_absorb_catalog_import).
+        """
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(coins)")}
+        if "spot" in cols:
+            conn.execute(self._CATALOG_IMPORT_SQL)
+            conn.execute("""
+                INSERT OR REPLACE INTO catalog_import(name, spot, futures, last_seen)
+                SELECT name, spot, futures, last_seen FROM coins
+            """)
+            conn.execute("""
+                CREATE TABLE coins_new (
+                    name TEXT PRIMARY KEY,
+                    favorite INTEGER NOT NULL DEFAULT 0,
+                    note TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            conn.execute("INSERT INTO coins_new(name, favorite, note) SELECT name, favorite, note FROM coins")
+            conn.execute("DROP TABLE coins")
+            conn.execute("ALTER TABLE coins_new RENAME TO coins")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_fav ON coins(favorite);")
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        if {"listing_history", "exchanges"} <= tables:
+            conn.execute(self._CATALOG_HISTORY_IMPORT_SQL)
+            conn.execute("""
+                INSERT INTO catalog_history_import(ts, coin, exchange, market_type, change)
+                SELECT h.ts, h.coin, e.name, h.market_type, h.change
+                FROM listing_history h JOIN exchanges e ON e.id = h.exchange_id
+            """)
+        for table in ("listing_history", "coin_listings", "exchanges"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
 
-    def _is_table_empty(self) -> bool:
-        cur = self._conn.execute("SELECT 1 FROM coins LIMIT 1")
-        return cur.fetchone() is None
+    # монеты для каталога внутри файла профиля: после миграции 5 и в экспортированных профилях
+    _CATALOG_IMPORT_SQL = """
+        CREATE TABLE IF NOT EXISTS catalog_import (
+            name TEXT PRIMARY KEY,
+            spot TEXT NOT NULL DEFAULT '',
+            futures TEXT NOT NULL DEFAULT '',
+            last_seen INTEGER NOT NULL DEFAULT 0
+        )
+    """
+    _CATALOG_HISTORY_IMPORT_SQL = """
+        CREATE TABLE IF NOT EXISTS catalog_history_import (
+            ts INTEGER NOT NULL,
+            coin TEXT NOT NULL,
+            exchange TEXT NOT NULL,
+            market_type TEXT NOT NULL,
+            change INTEGER NOT NULL
+        )
+    """
+
+    def _absorb_catalog_import(self):
+        """Слить отложенные монеты и историю из файла профиля в общий каталог и удалить их из профиля."""
+        conn = self._reader()
+        tables = {row[0] for row in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type='table' "
+            "AND name IN ('catalog_import', 'catalog_history_import')")}
+        if not tables:
+            return
+        rows = conn.execute(
+            "SELECT name, spot, futures, last_seen FROM main.catalog_import"
+        ).fetchall() if "catalog_import" in tables else []
+        history = conn.execute(
+            "SELECT ts, coin, exchange, market_type, change FROM main.catalog_history_import"
+        ).fetchall() if "catalog_history_import" in tables else []
+        merged = self._catalog.submit(lambda c: self._catalog.merge(c, rows, history)).result()
+
+        def _drop(c):
+            c.execute("DROP TABLE IF EXISTS catalog_import")
+            c.execute("DROP TABLE IF EXISTS catalog_history_import")
+        self._write(_drop, wait=True)
+        if merged:
+            self._catalog.notify(self, merged)
+
+    # ---------- соединения ----------
+
+    def _open(self):
+        self._writer = DatabaseWriter(self.filename)
+        self._catalog.register(self)
+
+    def _shutdown(self):
+        """Дописать очередь, закрыть писателя и все read-соединения (файл освобождается)."""
+        self._catalog.unregister(self)
+        self._catalog.flush()
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._writer = None
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+            self._generation += 1
+        for conn in readers:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _reader(self) -> sqlite3.Connection:
+        """Read-соединение текущего потока. Сначала дожидаемся собственных записей потока (read-your-writes)."""
+        last = getattr(self._local, "last_write", None)
+        if last is not None and last[0] is self._writer:
+            last[0].wait_for(last[1])
+        self._catalog.wait_own_writes()
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == self._generation:
+            return cached[1]
+        conn = _connect(self.filename, readonly=True)
+        conn.execute("ATTACH DATABASE ? AS cat", (self._catalog.path,))
+        with self._readers_lock:
+            self._readers.append(conn)
+            self._local.conn = (self._generation, conn)
+        return conn
+
+    def _write(self, fn, wait: bool = False, in_tx: bool = True, catalog: bool = False):
+        """
+        Отдать запись писателю профиля (catalog=True — писателю общего каталога).
+        wait=True — дождаться коммита и вернуть результат fn, иначе вернуть Future.
+        Внутри write_session запись только копится (результат — None).
+        """
+        session = getattr(self._local, "session", None)
+        if session is not None and in_tx:
+            session.append((catalog, fn))
+            return None
+        if catalog:
+            future = self._catalog.submit(fn)
+            return future.result() if wait else future
+        future = self._writer.submit(fn, in_tx=in_tx)
+        self._local.last_write = (self._writer, future.seq)
+        return future.result() if wait else future
+
+    @staticmethod
+    def _after(listed: Optional[Future], fn):
+        """
+        Запись профиля fn, которая выполнится только после коммита записи каталога listed.
+        Писатели разные и друг друга не ждут: без этого монета появляется в профиле раньше
+        своих листингов. Ошибка записи каталога проваливает и запись профиля.
+        """
+        if listed is None:
+            return fn
+
+        def _run(conn):
+            listed.result()
+            return fn(conn)
+        return _run
 
     def load(self):
         pass
@@ -82,22 +908,11 @@ class Database:
         pass
 
     def close(self):
-        try:
-            self._conn.close()
-        except Exception:
-            pass
+        self._shutdown()
 
     # Жёстко закрыть соединение (для Windows, чтобы отпустить файл)
     def dispose(self):
-        try:
-            self._conn.commit()
-        except Exception:
-            pass
-        try:
-            self._conn.close()
-        except Exception:
-            pass
-        self._conn = None
+        self._shutdown()
 
     def _unlink_wal_files(self, base_path: str):
         # удаляем хвосты WAL/SHM, если остались
@@ -117,44 +932,328 @@ class Database:
             except Exception:
                 pass
 
+    # ---------- запись ----------
+
+    @contextmanager
+    def write_session(self):
+        """
+        Все записи потока внутри блока уходят писателю одним намерением — одной транзакцией.
+        Вложенные сессии сливаются во внешнюю; при исключении ничего не записывается.
+            with db.write_session():
+                for ...: db.save_coin(...)
+        """
+        if getattr(self._local, "session", None) is not None:
+            yield self
+            return
+        self._local.session = []
+        self._local.deferred = []
+        try:
+            yield self
+        except Exception:
+            self._local.session = None
+            self._local.deferred = None
+            raise
+        ops, self._local.session = self._local.session, None
+        deferred, self._local.deferred = self._local.deferred, None
+        # каталог — раньше профиля: запись профиля ждёт коммита каталога (см. _after),
+        # поэтому монета в профиле не появляется без своих листингов
+        listed = None
+        for catalog in (True, False):
+            group = [fn for is_catalog, fn in ops if is_catalog == catalog]
+            if group:
+                def _run_all(conn, group=group):
+                    for op in group:
+                        op(conn)
+                if catalog:
+                    listed = self._write(_run_all, catalog=True)
+                else:
+                    self._write(self._after(listed, _run_all))
+        for fn in deferred:
+            fn()
+
+    # ---------- индекс бирж в памяти ----------
+
+    def exchange_index(self):
+        """Битовый индекс листингов (exchange_index.ExchangeIndex). Строится один раз, дальше ведётся инкрементально."""
+        with self._index_lock:
+            if self._index is None:
+                from exchange_index import ExchangeIndex
+                self.reload_from_file()
+                cur = self._reader().execute(self._COIN_SQL)
+                self._index = ExchangeIndex.build(cur)
+            return self._index
+
+    def _defer(self, fn):
+        """Выполнить fn после отправки записи писателю (внутри write_session — на выходе из неё)."""
+        pending = getattr(self._local, "deferred", None)
+        if pending is not None:
+            pending.append(fn)
+            return
+        fn()
+
+    def _index_apply(self, op):
+        """Применить изменение к индексу после отправки записи писателю."""
+        def _apply():
+            with self._index_lock:
+                if self._index is not None:
+                    op(self._index)
+        self._defer(_apply)
+
+    def _on_catalog_update(self, rows: List[Tuple[str, str, str]]):
+        """Другой профиль обновил монеты в каталоге: в индексе обновляем только монеты этого профиля."""
+        with self._index_lock:
+            if self._index is not None:
+                self._index.refresh(rows)
+        self.catalog_version += 1
+
     def save_coin(self, name: str, spot_exchanges: str, futures_exchanges: str):
         if not name:
             return
-        self._conn.execute("""
-            INSERT INTO coins(name, spot, futures)
-            VALUES(?, ?, ?)
-            ON CONFLICT(name) DO UPDATE SET
-                spot=excluded.spot,
-                futures=excluded.futures
-        """, (name, spot_exchanges or "", futures_exchanges or ""))
-        self._conn.commit()
+        self.save_coins([(name, spot_exchanges, futures_exchanges)])
+
+    def save_coins(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """Пакетный upsert [(name, spot, futures), ...]: листинги — в каталог, монета — в состав профиля."""
+        # одна монета дважды в пакете: остаётся последняя строка (иначе листинги сольются из обеих)
+        data = list({name: (name, spot or "", futures or "") for name, spot, futures in rows if name}.values())
+        if not data:
+            return 0
+        names = [(r[0],) for r in data]
+        listed = self._write(lambda conn: self._catalog.upsert_rows(conn, data), catalog=True)
+        self._write(self._after(listed, lambda conn: conn.executemany(
+            "INSERT OR IGNORE INTO coins(name) VALUES(?)", names)))
+        self._index_apply(lambda index: index.upsert(data))
+        self._defer(lambda: self._catalog.notify(self, data))
+        return len(data)
 
     def set_favorite(self, name: str, value: bool):
-        self._conn.execute("UPDATE coins SET favorite=? WHERE name=?", (1 if value else 0, name))
-        self._conn.commit()
+        params = (1 if value else 0, name)
+        self._write(lambda conn: conn.execute("UPDATE coins SET favorite=? WHERE name=?", params))
+        self._index_apply(lambda index: index.set_favorite([name], value))
+
+    def set_favorites(self, names: Iterable[str], value: bool) -> int:
+        flag = 1 if value else 0
+        data = [(flag, n) for n in names]
+        count = self._write(
+            lambda conn: max(conn.executemany("UPDATE coins SET favorite=? WHERE name=?", data).rowcount, 0),
+            wait=True
+        ) or 0
+        self._index_apply(lambda index: index.set_favorite([n for _, n in data], value))
+        return count
 
     def set_note(self, name: str, text: str):
-        self._conn.execute("UPDATE coins SET note=? WHERE name=?", (text or "", name))
-        self._conn.commit()
+        params = (text or "", name)
+        self._write(lambda conn: conn.execute("UPDATE coins SET note=? WHERE name=?", params))
+        self._index_apply(lambda index: index.set_note({name: text}))
+
+    def set_notes(self, notes: Dict[str, str]) -> int:
+        data = [(text or "", name) for name, text in notes.items()]
+        count = self._write(
+            lambda conn: max(conn.executemany("UPDATE coins SET note=? WHERE name=?", data).rowcount, 0),
+            wait=True
+        ) or 0
+        self._index_apply(lambda index: index.set_note(dict(notes)))
+        return count
 
     def get_note(self, name: str) -> str:
-        cur = self._conn.execute("SELECT note FROM coins WHERE name=?", (name,))
+        cur = self._reader().execute("SELECT note FROM main.coins WHERE name=?", (name,))
         row = cur.fetchone()
         return row[0] if row else ""
 
     def delete_coin(self, name: str) -> bool:
-        cur = self._conn.execute("DELETE FROM coins WHERE name=?", (name,))
-        self._conn.commit()
-        return cur.rowcount > 0
+        return self.delete_coins([name]) > 0
+
+    def delete_coins(self, names: Iterable[str]) -> int:
+        data = [(n,) for n in names]
+
+        # из профиля уходит только членство: листинги в каталоге нужны другим профилям
+        count = self._write(
+            lambda conn: max(conn.executemany("DELETE FROM coins WHERE name=?", data).rowcount, 0),
+            wait=True
+        ) or 0
+        self._index_apply(lambda index: index.remove([n for n, in data]))
+        return count
+
+    # поле Coin -> выражение над p (coins профиля) и c (coins каталога); только они допустимы в проекциях
+    _FIELDS = {
+        "name": "p.name",
+        "spot_exchanges": "COALESCE(c.spot, '')",
+        "futures_exchanges": "COALESCE(c.futures, '')",
+        "favorite": "p.favorite",
+        "note": "p.note",
+        "last_seen": "COALESCE(c.last_seen, 0)",
+    }
+    _FROM_SQL = " FROM main.coins p LEFT JOIN cat.coins c ON c.name = p.name"
+    _COIN_SQL = "SELECT p.name, COALESCE(c.spot, ''), COALESCE(c.futures, ''), p.favorite, p.note" + _FROM_SQL
+
+    @staticmethod
+    def _coin(r) -> Coin:
+        return Coin(name=r[0], spot_exchanges=r[1], futures_exchanges=r[2], favorite=bool(r[3]), note=r[4] or "")
+
+    def _columns(self, fields: Iterable[str]) -> str:
+        try:
+            return ", ".join(self._FIELDS[f] for f in fields)
+        except KeyError as e:
+            raise ValueError(f"Неизвестное поле монеты: {e.args[0]}")
+
+    def get_coin(self, name: str) -> Optional[Coin]:
+        """Точечное чтение по имени (первичный ключ)."""
+        row = self._reader().execute(self._COIN_SQL + " WHERE p.name=?", (name,)).fetchone()
+        return self._coin(row) if row else None
+
+    def get_fields(self, name: str, fields: Iterable[str]) -> Optional[tuple]:
+        """Только нужные поля одной монеты: db.get_fields("BTC", ("favorite", "note"))."""
+        fields = tuple(fields)
+        row = self._reader().execute(
+            f"SELECT {self._columns(fields)}{self._FROM_SQL} WHERE p.name=?", (name,)).fetchone()
+        return tuple(row) if row else None
+
+    def is_favorite(self, name: str) -> bool:
+        row = self._reader().execute("SELECT favorite FROM main.coins WHERE name=?", (name,)).fetchone()
+        return bool(row[0]) if row else False
+
+    def iter_coins(self, fields: Iterable[str] = None, batch: int = 512) -> Iterator:
+        """
+        Монеты профиля по одной, без сборки всего списка.
+            fields=None                  -> Coin
+            fields=("name", "favorite")  -> кортежи только этих полей
+        """
+        if fields is None:
+            cur = self._reader().execute(self._COIN_SQL)
+            make = self._coin
+        else:
+            cur = self._reader().execute(f"SELECT {self._columns(tuple(fields))}{self._FROM_SQL}")
+            make = tuple
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            for r in rows:
+                yield make(r)
+
+    def coin_names(self) -> List[str]:
+        return [r[0] for r in self._reader().execute("SELECT name FROM main.coins")]
 
     def search_coins(self) -> List[Coin]:
-        cur = self._conn.execute("SELECT name, spot, futures, favorite, note FROM coins")
-        rows = cur.fetchall()
-        return [Coin(name=r[0], spot_exchanges=r[1], futures_exchanges=r[2],
-                     favorite=bool(r[3]), note=r[4] or "") for r in rows]
+        return list(self.iter_coins())
+
+    def list_exchanges(self) -> List[str]:
+        """Биржи, на которых есть хотя бы одна монета профиля (по алфавиту)."""
+        cur = self._reader().execute("""
+            SELECT e.name FROM cat.exchanges e
+            WHERE EXISTS (
+                SELECT 1 FROM cat.coin_listings l JOIN main.coins p ON p.name = l.coin
+                WHERE l.exchange_id = e.id)
+            ORDER BY e.name
+        """)
+        return [r[0] for r in cur]
+
+    def filter_coins(self, exchanges: Iterable[str] = None, match: str = "any", market: str = "all",
+                     only: bool = False, name_contains: str = "", favorites_only: bool = False) -> List[Coin]:
+        """
+        Фильтр монет целиком на стороне SQL.
+          exchanges — биржи (None — без условия по биржам);
+          match     — "any": есть хоть на одной, "all": есть на всех;
+          market    — "all" / "spot" / "futures": где искать листинг;
+          only      — монета не торгуется нигде, кроме exchanges (спот и фьючерсы вместе).
+        Сортировка: избранные сверху, затем по имени.
+        """
+        where, params = [], []
+        market_sql = ""
+        if market in (MARKET_SPOT, MARKET_FUTURES):
+            market_sql = " AND l.market_type = ?"
+
+        if exchanges is not None:
+            selected = list(dict.fromkeys(exchanges))
+            marks = ",".join("?" * len(selected))
+            sub = (f"SELECT l.coin FROM cat.coin_listings l JOIN cat.exchanges e ON e.id = l.exchange_id "
+                   f"WHERE e.name IN ({marks}){market_sql}")
+            if match != "all" or selected:  # "есть на всех" из пустого списка выполняется всегда
+                params.extend(selected)
+                if market_sql:
+                    params.append(market)
+                if match == "all":
+                    sub += " GROUP BY l.coin HAVING COUNT(DISTINCT l.exchange_id) = ?"
+                    params.append(len(selected))
+                where.append(f"p.name IN ({sub})")
+            if only:
+                where.append(f"""NOT EXISTS (
+                    SELECT 1 FROM cat.coin_listings l JOIN cat.exchanges e ON e.id = l.exchange_id
+                    WHERE l.coin = p.name AND e.name NOT IN ({marks}))""")
+                params.extend(selected)
+
+        if market_sql:
+            where.append("EXISTS (SELECT 1 FROM cat.coin_listings l WHERE l.coin = p.name AND l.market_type = ?)")
+            params.append(market)
+        if name_contains:
+            where.append("instr(p.name, ?) > 0")
+            params.append(name_contains)
+        if favorites_only:
+            where.append("p.favorite = 1")
+
+        sql = self._COIN_SQL
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.favorite DESC, p.name"
+        cur = self._reader().execute(sql, params)
+        return [self._coin(r) for r in cur]
+
+    def listing_changes(self, since: float, market: str = None, change: int = None,
+                        coin: str = None) -> List[ListingChange]:
+        """
+        История листингов монет профиля с момента since (unix time), от новых к старым.
+            db.listing_changes(time.time() - 86400, MARKET_FUTURES, LISTED)  # новые фьючерсы за 24ч
+        """
+        sql = """
+            SELECT h.ts, h.coin, e.name, h.market_type, h.change
+            FROM cat.listing_history h
+            JOIN cat.exchanges e ON e.id = h.exchange_id
+            JOIN main.coins p ON p.name = h.coin
+            WHERE h.ts >= ?
+        """
+        params = [int(since)]
+        if market in (MARKET_SPOT, MARKET_FUTURES):
+            sql += " AND h.market_type = ?"
+            params.append(market)
+        if change is not None:
+            sql += " AND h.change = ?"
+            params.append(change)
+        if coin:
+            sql += " AND h.coin = ?"
+            params.append(coin)
+        sql += " ORDER BY h.ts DESC, h.id DESC"
+        return [ListingChange(*row) for row in self._reader().execute(sql, params)]
+
+    def listing_spans(self, coin: str) -> List[Tuple[str, str, int, int]]:
+        """Активные листинги монеты: (exchange, market_type, first_seen, last_seen)."""
+        cur = self._reader().execute("""
+            SELECT e.name, l.market_type, l.first_seen, c.last_seen
+            FROM cat.coin_listings l
+            JOIN cat.exchanges e ON e.id = l.exchange_id
+            JOIN cat.coins c ON c.name = l.coin
+            JOIN main.coins p ON p.name = l.coin
+            WHERE l.coin = ?
+            ORDER BY l.market_type, e.name
+        """, (coin,))
+        return cur.fetchall()
+
+    def maintenance_stats(self) -> Dict[str, WalStats]:
+        """WAL и чекпоинты: {"profile": ..., "catalog": ...}."""
+        stats = {"catalog": self._catalog.writer.stats()}
+        if self._writer is not None:
+            stats["profile"] = self._writer.stats()
+        return stats
+
+    def checkpoint(self, mode: str = "TRUNCATE"):
+        """Чекпоинт WAL профиля вне очереди политики (дожидается выполнения)."""
+        writer = self._writer
+        writer.submit(lambda conn: writer.checkpoint(conn, mode), in_tx=False).result()
+        return writer.stats()
 
     def reload_from_file(self):
-        pass
+        # записи других потоков (BatchParseThread) становятся видны после их коммита
+        self._catalog.flush()
+        if self._writer is not None:
+            self._writer.flush()
 
     def delete_profile(self) -> bool:
         self.dispose()  # полностью закрыть соединение
@@ -165,25 +1264,99 @@ class Database:
                 os.remove(self.filename)
                 ok = True
             except PermissionError:
-                import time
                 time.sleep(0.2)
                 self._unlink_wal_files(self.filename)
                 os.remove(self.filename)
                 ok = True
         return ok
 
-    def copy_profile(self, new_profile_name: str):
+    def backup_to(self, path: str, progress=None, pages: int = BACKUP_PAGES_PER_STEP,
+                  embed_catalog: bool = False):
+        """
+        Онлайн-копия профиля в файл path через backup API SQLite.
+        Источник читается отдельным соединением внутри одной read-транзакции, поэтому копия —
+        согласованный снимок на момент старта, а писатель продолжает коммитить параллельно.
+        progress(done_pages, total_pages) вызывается после каждого шага.
+        embed_catalog — положить листинги монет профиля из каталога в саму копию (для файлов,
+        которые уносят из папки profiles: при открытии они сливаются в каталог той папки).
+        """
+        self.reload_from_file()  # всё, что уже отдано писателю, попадёт в копию
+        tmp = path + ".part"
+        for p in (tmp, tmp + "-wal", tmp + "-shm", tmp + "-journal"):
+            if os.path.exists(p):
+                os.remove(p)
+        src = _connect(self.filename, readonly=True)
+        dst = sqlite3.connect(tmp)
+        try:
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # фиксируем снимок
+            cb = (lambda status, remaining, total: progress(total - remaining, total)) if progress else None
+            src.backup(dst, pages=pages, progress=cb, sleep=0)
+            src.execute("COMMIT")
+        finally:
+            dst.close()
+            src.close()
+        if embed_catalog:
+            # листинги каждой монеты снимка закоммичены раньше неё самой (см. _after), но могли
+            # прийти уже после flush выше — дописываем каталог до текущего момента
+            self._catalog.flush()
+            self._embed_catalog(tmp)
+        self._unlink_wal_files(path)
+        os.replace(tmp, path)
+        return path
+
+    def _embed_catalog(self, path: str):
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            conn.execute("ATTACH DATABASE ? AS cat", (self._catalog.path,))
+            conn.execute("BEGIN")
+            conn.execute(self._CATALOG_IMPORT_SQL)
+            conn.execute(self._CATALOG_HISTORY_IMPORT_SQL)
+            conn.execute("""
+                INSERT OR REPLACE INTO main.catalog_import(name, spot, futures, last_seen)
+                SELECT c.name, c.spot, c.futures, c.last_seen
+                FROM cat.coins c JOIN main.coins p ON p.name = c.name
+            """)
+            conn.execute("""
+                INSERT INTO main.catalog_history_import(ts, coin, exchange, market_type, change)
+                SELECT h.ts, h.coin, e.name, h.market_type, h.change
+                FROM cat.listing_history h
+                JOIN cat.exchanges e ON e.id = h.exchange_id
+                JOIN main.coins p ON p.name = h.coin
+            """)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def copy_profile(self, new_profile_name: str, progress=None):
         new_filename = os.path.join(self.PROFILES_DIR, f"{new_profile_name}.db")
-        self._conn.commit()
-        self._conn.close()
-        shutil.copyfile(self.filename, new_filename)
-        # Открываем текущий обратно
-        self._conn = sqlite3.connect(self.filename, check_same_thread=False)
-        self._conn.execute("PRAGMA journal_mode=WAL;")
-        self._conn.execute("PRAGMA synchronous=NORMAL;")
-        self._conn.execute("PRAGMA temp_store=MEMORY;")
+        if os.path.exists(new_filename):
+            raise Exception(f"Профиль '{new_profile_name}' уже существует")
+        self.backup_to(new_filename, progress)
         return Database(new_profile_name)
 
+    def export_profile(self, path: str, progress=None) -> str:
+        """Экспорт профиля в произвольный .db файл (профиль остаётся открытым, листинги — внутри файла)."""
+        return self.backup_to(path, progress, embed_catalog=True)
+
+    def snapshot_profile(self, progress=None) -> str:
+        """Снимок профиля в profiles/.snapshots/<профиль>/; старые снимки сверх SNAPSHOTS_KEEP удаляются."""
+        folder = os.path.join(self.PROFILES_DIR, SNAPSHOTS_DIRNAME, self.profile_name)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, time.strftime("%Y%m%d_%H%M%S") + ".db")
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(folder, time.strftime("%Y%m%d_%H%M%S") + f"_{n}.db")
+            n += 1
+        self.backup_to(path, progress, embed_catalog=True)
+        snaps = sorted(f for f in os.listdir(folder) if f.endswith(".db"))
+        for old in snaps[:-SNAPSHOTS_KEEP]:
+            try:
+                os.remove(os.path.join(folder, old))
+            except OSError:
+                pass
+        return path
+
     def rename_profile(self, new_name: str):
         old_path = self.filename
         new_path = os.path.join(os.path.dirname(old_path), f"{new_name}.db")
@@ -194,10 +1367,7 @@ class Database:
                 os.replace(old_path, new_path)
             self.filename = new_path
             self.profile_name = new_name
-            self._conn = sqlite3.connect(self.filename, check_same_thread=False)
-            self._conn.execute("PRAGMA journal_mode=WAL;")
-            self._conn.execute("PRAGMA synchronous=NORMAL;")
-            self._conn.execute("PRAGMA temp_store=MEMORY;")
+            self._open()
             return self
         except Exception as e:
             raise Exception(f"Не удалось переименовать профиль: {str(e)}")
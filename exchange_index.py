@@ -0,0 +1,434 @@
+# exchange_index.py
+# Битовый индекс листингов профиля в памяти.
+# Каждой бирже — свой бит, у каждой монеты две маски (спот и фьючерсы) по 128+ бит.
+# Фильтры apply_filter ("любая из", "эксклюзивно", тип торговли) считаются
+# векторными побитовыми операциями numpy сразу по всем монетам.
+# Последние результаты фильтра держатся в маленьком LRU: повтор запроса (шаг назад) отдаётся
+# из кэша, а уточнение (длиннее имя, меньше бирж в "любая из", спот/фьючерсы вместо "все",
+# только избранные) считается только по прошлому результату.
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # без numpy — те же маски на питоновских int, просто медленнее
+    np = None
+
+from database_sqlite import Coin, MARKET_FUTURES, MARKET_SPOT, split_exchanges
+from name_index import NameIndex
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+FILTER_CACHE_SIZE = 8   # сколько последних состояний фильтра помнить
+
+
+def _refines(new: tuple, old: tuple) -> bool:
+    """Результат запроса new — подмножество результата old (ключи как в ExchangeIndex._filter_key)."""
+    sel, match, market, only, name, favorites = new
+    old_sel, old_match, old_market, old_only, old_name, old_favorites = old
+    if (match, only) != (old_match, old_only):
+        return False
+    if old_sel is not None and sel != old_sel:
+        if sel is None or only:
+            return False   # "эксклюзивно": другой набор бирж — непересекающиеся результаты
+        if match == "all" and not sel >= old_sel:
+            return False
+        if match != "all" and not sel <= old_sel:
+            return False
+    if old_market != "all" and market != old_market:
+        return False
+    return old_name in name and (favorites or not old_favorites)
+
+
+class ExchangeIndex:
+    """
+    Слоты монет плотные: при удалении последняя монета переезжает на место удалённой.
+    Потокобезопасен (GUI и BatchParseThread пишут через Database).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._bits: Dict[str, int] = {}      # биржа -> номер бита
+        self._coins: List[Coin] = []         # слот -> монета
+        self._slot: Dict[str, int] = {}      # имя -> слот
+        self._names = NameIndex()            # поиск по подстроке/префиксу имени
+        self._counts: Dict[str, int] = {}    # биржа -> сколько монет на ней (спот или фьючерсы)
+        self._rank = None                    # ранги по имени, пересчитываются лениво
+        self._version = 0                    # растёт при любом изменении, влияющем на фильтр
+        self._cache = OrderedDict()          # ключ фильтра -> слоты результата в порядке вывода
+        self._cache_version = 0
+        if np is not None:
+            self._words = 2                  # 128 бит, дальше растёт само
+            self._spot = np.zeros((64, self._words), dtype=np.uint64)
+            self._fut = np.zeros((64, self._words), dtype=np.uint64)
+            self._fav = np.zeros(64, dtype=bool)
+        else:
+            self._spot = []
+            self._fut = []
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, str, str, int, str]]) -> "ExchangeIndex":
+        """rows: (name, spot, futures, favorite, note) — как в таблице coins (имена уникальны)."""
+        index = cls()
+        coins, spot_masks, fut_masks = [], [], []
+        counts = index._counts
+        for name, spot, futures, favorite, note in rows:
+            coins.append(Coin(name=name, spot_exchanges=spot or "", futures_exchanges=futures or "",
+                              favorite=bool(favorite), note=note or ""))
+            spot_list, fut_list = split_exchanges(spot), split_exchanges(futures)
+            spot_masks.append(index._mask(spot_list))
+            fut_masks.append(index._mask(fut_list))
+            for ex in set(spot_list).union(fut_list):
+                counts[ex] = counts.get(ex, 0) + 1
+        with index._lock:
+            index._coins = coins
+            index._slot = {c.name: i for i, c in enumerate(coins)}
+            index._names = NameIndex(index._slot)
+            if np is not None:
+                index._ensure_words()
+                index._ensure_capacity(len(coins))
+                index._spot[:len(coins)] = index._masks_to_array(spot_masks)
+                index._fut[:len(coins)] = index._masks_to_array(fut_masks)
+                index._fav[:len(coins)] = [c.favorite for c in coins]
+            else:
+                index._spot, index._fut = spot_masks, fut_masks
+        return index
+
+    def __len__(self):
+        return len(self._coins)
+
+    # ---------- маски ----------
+
+    def _mask(self, exchanges: Iterable[str], grow: bool = True) -> int:
+        mask = 0
+        for ex in exchanges:
+            bit = self._bits.get(ex)
+            if bit is None:
+                if not grow:
+                    continue
+                bit = self._bits[ex] = len(self._bits)
+            mask |= 1 << bit
+        return mask
+
+    def _ensure_words(self):
+        need = max(1, (len(self._bits) + WORD_BITS - 1) // WORD_BITS)
+        if np is None or need <= self._words:
+            return
+        pad = ((0, 0), (0, need - self._words))
+        self._spot = np.pad(self._spot, pad)
+        self._fut = np.pad(self._fut, pad)
+        self._words = need
+
+    def _to_words(self, mask: int):
+        return np.array([(mask >> (WORD_BITS * w)) & WORD_MASK for w in range(self._words)], dtype=np.uint64)
+
+    def _masks_to_array(self, masks: List[int]):
+        out = np.empty((len(masks), self._words), dtype=np.uint64)
+        for w in range(self._words):
+            shift = WORD_BITS * w
+            out[:, w] = np.fromiter(((m >> shift) & WORD_MASK for m in masks), dtype=np.uint64, count=len(masks))
+        return out
+
+    def _ensure_capacity(self, n: int):
+        cap = self._spot.shape[0]
+        if n <= cap:
+            return
+        while cap < n:
+            cap *= 2
+        grow = cap - self._spot.shape[0]
+        self._spot = np.pad(self._spot, ((0, grow), (0, 0)))
+        self._fut = np.pad(self._fut, ((0, grow), (0, 0)))
+        self._fav = np.pad(self._fav, (0, grow))
+
+    # ---------- изменения ----------
+
+    def _count(self, coin: Coin, delta: int):
+        """Учесть биржи монеты в счётчиках (delta = +1 / -1)."""
+        counts = self._counts
+        for ex in set(split_exchanges(coin.spot_exchanges)).union(split_exchanges(coin.futures_exchanges)):
+            left = counts.get(ex, 0) + delta
+            if left > 0:
+                counts[ex] = left
+            else:
+                counts.pop(ex, None)
+
+    def _put(self, name: str, spot: str, futures: str):
+        spot_mask = self._mask(split_exchanges(spot))
+        fut_mask = self._mask(split_exchanges(futures))
+        self._version += 1
+        slot = self._slot.get(name)
+        if slot is None:
+            slot = len(self._coins)
+            self._slot[name] = slot
+            self._coins.append(Coin(name=name, spot_exchanges=spot, futures_exchanges=futures))
+            self._names.add(name)
+            self._rank = None
+            if np is not None:
+                self._ensure_capacity(slot + 1)
+                self._fav[slot] = False
+            else:
+                self._spot.append(0)
+                self._fut.append(0)
+            self._count(self._coins[slot], +1)
+        else:
+            coin = self._coins[slot]
+            self._count(coin, -1)
+            coin.spot_exchanges, coin.futures_exchanges = spot, futures
+            self._count(coin, +1)
+        if np is not None:
+            self._ensure_words()
+            self._spot[slot] = self._to_words(spot_mask)
+            self._fut[slot] = self._to_words(fut_mask)
+        else:
+            self._spot[slot] = spot_mask
+            self._fut[slot] = fut_mask
+
+    def upsert(self, rows: Iterable[Tuple[str, str, str]]):
+        with self._lock:
+            for name, spot, futures in rows:
+                if name:
+                    self._put(name, spot or "", futures or "")
+
+    def refresh(self, rows: Iterable[Tuple[str, str, str]]):
+        """Как upsert, но только для монет, которые уже есть в индексе (обновления общего каталога)."""
+        with self._lock:
+            for name, spot, futures in rows:
+                if name in self._slot:
+                    self._put(name, spot or "", futures or "")
+
+    def set_favorite(self, names: Iterable[str], value: bool):
+        with self._lock:
+            for name in names:
+                slot = self._slot.get(name)
+                if slot is None:
+                    continue
+                self._coins[slot].favorite = bool(value)
+                self._version += 1
+                if np is not None:
+                    self._fav[slot] = bool(value)
+
+    def set_note(self, notes: Dict[str, str]):
+        with self._lock:
+            for name, text in notes.items():
+                slot = self._slot.get(name)
+                if slot is not None:
+                    self._coins[slot].note = text or ""
+
+    def remove(self, names: Iterable[str]):
+        with self._lock:
+            for name in names:
+                slot = self._slot.pop(name, None)
+                if slot is None:
+                    continue
+                self._names.remove(name)
+                self._version += 1
+                self._count(self._coins[slot], -1)
+                last = len(self._coins) - 1
+                if slot != last:
+                    moved = self._coins[last]
+                    self._coins[slot] = moved
+                    self._slot[moved.name] = slot
+                    self._spot[slot] = self._spot[last]
+                    self._fut[slot] = self._fut[last]
+                    if np is not None:
+                        self._fav[slot] = self._fav[last]
+                self._coins.pop()
+                if np is not None:
+                    self._spot[last] = 0
+                    self._fut[last] = 0
+                    self._fav[last] = False
+                else:
+                    self._spot.pop()
+                    self._fut.pop()
+                self._rank = None
+
+    # ---------- запросы ----------
+
+    def get(self, name: str) -> Optional[Coin]:
+        with self._lock:
+            slot = self._slot.get(name)
+            return self._coins[slot] if slot is not None else None
+
+    def suggest(self, query: str, limit: int = 20) -> List[str]:
+        """Подсказки имён для поля ввода: префикс, затем подстрока."""
+        with self._lock:
+            return self._names.suggest(query, limit)
+
+    def exchanges(self) -> List[str]:
+        """Биржи, на которых есть хотя бы одна монета (по алфавиту)."""
+        with self._lock:
+            return sorted(self._counts)
+
+    def exchange_counts(self) -> Dict[str, int]:
+        """Биржа -> число монет на ней (спот или фьючерсы). Ведётся при каждом изменении, без пересчёта."""
+        with self._lock:
+            return dict(self._counts)
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    @staticmethod
+    def _filter_key(selected, match, market, only, name_contains, favorites_only) -> tuple:
+        return (frozenset(selected) if selected is not None else None, match, market, bool(only),
+                name_contains or "", bool(favorites_only))
+
+    def filter(self, exchanges: Iterable[str] = None, match: str = "any", market: str = "all",
+               only: bool = False, name_contains: str = "", favorites_only: bool = False,
+               cancelled: Callable[[], bool] = None) -> Optional[List[Coin]]:
+        """
+        Та же семантика, что у Database.filter_coins, но без SQL: избранные сверху, затем по имени.
+        cancelled() проверяется между этапами (фоновый фильтр): вернул True — результат None.
+        """
+        selected = list(dict.fromkeys(exchanges)) if exchanges is not None else None
+        key = self._filter_key(selected, match, market, only, name_contains, favorites_only)
+        stop = cancelled or (lambda: False)
+        with self._lock:
+            if self._cache_version != self._version:
+                self._cache.clear()
+                self._cache_version = self._version
+            slots = self._cache.get(key)
+            if slots is None:
+                slots = self._compute(key, selected, stop)
+                if slots is None:
+                    return None
+                self._cache[key] = slots
+                if len(self._cache) > FILTER_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(key)
+            coins = self._coins
+            return [coins[i] for i in (slots.tolist() if np is not None else slots)]
+
+    def matching(self, names: Iterable[str], exchanges: Iterable[str] = None, match: str = "any",
+                 market: str = "all", only: bool = False, name_contains: str = "",
+                 favorites_only: bool = False) -> List[Coin]:
+        """Монеты из names, которые прошли бы filter с теми же параметрами (живые обновления таблицы)."""
+        selected = list(dict.fromkeys(exchanges)) if exchanges is not None else None
+        with self._lock:
+            rows = [self._slot[n] for n in dict.fromkeys(names)
+                    if n in self._slot and (name_contains or "") in n]
+            if np is not None:
+                rows = np.asarray(rows, dtype=np.int64)
+            slots = self._select(rows, selected, match, market, only, favorites_only)
+            coins = self._coins
+            return [coins[i] for i in (slots.tolist() if np is not None else slots)]
+
+    def _compute(self, key, selected, stop):
+        """Слоты результата в порядке вывода; уточнение прошлого запроса — только по его результату."""
+        _, match, market, only, name_contains, favorites_only = key
+        base = min(((k, v) for k, v in self._cache.items() if _refines(key, k)),
+                   key=lambda kv: len(kv[1]), default=None)
+        if base is not None:
+            base_key, rows = base
+            if name_contains != base_key[4]:
+                rows = self._narrow_by_name(rows, name_contains)
+            if stop():
+                return None
+            # подмножество упорядоченного результата уже упорядочено — сортировать не нужно
+            return self._select(rows, selected, match, market, only, favorites_only)
+        rows = None
+        if name_contains:
+            names = self._names.contains(name_contains)
+            rows = [self._slot[n] for n in names]
+            if np is not None:
+                rows = np.asarray(rows, dtype=np.int64)
+            if stop():
+                return None
+        slots = self._select(rows, selected, match, market, only, favorites_only)
+        if stop():
+            return None
+        return self._sorted(slots)
+
+    def _narrow_by_name(self, rows, name_contains):
+        """Оставить в rows (порядок сохраняется) имена с подстрокой: через индекс имён или перебором rows — что меньше."""
+        coins = self._coins
+        if self._names.estimate(name_contains) < len(rows):
+            slots = [self._slot[n] for n in self._names.contains(name_contains)]
+            if np is None:
+                hit = set(slots)
+                return [i for i in rows if i in hit]
+            hit = np.zeros(len(coins), dtype=bool)
+            hit[np.asarray(slots, dtype=np.int64)] = True
+            return rows[hit[rows]]
+        if np is None:
+            return [i for i in rows if name_contains in coins[i].name]
+        return rows[np.fromiter((name_contains in coins[i].name for i in rows.tolist()), dtype=bool, count=len(rows))]
+
+    def _select(self, rows, selected, match, market, only, favorites_only):
+        if np is not None:
+            return self._filter_np(rows, selected, match, market, only, favorites_only)
+        return self._filter_py(rows, selected, match, market, only, favorites_only)
+
+    def _filter_np(self, rows, selected, match, market, only, favorites_only):
+        """rows — слоты-кандидаты (None — все монеты). Возвращает отобранные слоты в порядке rows."""
+        if rows is None:
+            n = len(self._coins)
+            spot, fut, fav = self._spot[:n], self._fut[:n], self._fav[:n]
+        else:
+            spot, fut, fav = self._spot[rows], self._fut[rows], self._fav[rows]
+        keep = np.ones(len(spot), dtype=bool)
+        if selected is not None:
+            sel = self._to_words(self._mask(selected, grow=False))
+            listed = spot if market == MARKET_SPOT else fut if market == MARKET_FUTURES else spot | fut
+            if match == "all":
+                if any(ex not in self._bits for ex in selected):
+                    keep[:] = False
+                elif selected:
+                    keep &= ((listed & sel) == sel).all(axis=1)
+            else:
+                keep &= (listed & sel).any(axis=1)
+            if only:
+                keep &= ~((spot | fut) & ~sel).any(axis=1)
+        if market == MARKET_SPOT:
+            keep &= spot.any(axis=1)
+        elif market == MARKET_FUTURES:
+            keep &= fut.any(axis=1)
+        if favorites_only:
+            keep &= fav
+        return np.flatnonzero(keep) if rows is None else rows[keep]
+
+    def _filter_py(self, rows, selected, match, market, only, favorites_only):
+        sel = self._mask(selected, grow=False) if selected is not None else 0
+        unknown = selected is not None and any(ex not in self._bits for ex in selected)
+        result = []
+        for i in range(len(self._coins)) if rows is None else rows:
+            coin = self._coins[i]
+            sp, fu = self._spot[i], self._fut[i]
+            if selected is not None:
+                listed = sp if market == MARKET_SPOT else fu if market == MARKET_FUTURES else sp | fu
+                if match == "all":
+                    if unknown or (listed & sel) != sel:
+                        continue
+                elif not listed & sel:
+                    continue
+                if only and (sp | fu) & ~sel:
+                    continue
+            if market == MARKET_SPOT and not sp:
+                continue
+            if market == MARKET_FUTURES and not fu:
+                continue
+            if favorites_only and not coin.favorite:
+                continue
+            result.append(i)
+        return result
+
+    def _sorted(self, slots):
+        """Слоты в порядке вывода: избранные сверху, затем по имени."""
+        coins = self._coins
+        if self._rank is None:
+            order = sorted(range(len(coins)), key=lambda i: coins[i].name)
+            if np is not None:
+                self._rank = np.empty(len(coins), dtype=np.int64)
+                self._rank[order] = np.arange(len(coins))
+            else:
+                self._rank = [0] * len(coins)
+                for r, i in enumerate(order):
+                    self._rank[i] = r
+        if np is not None:
+            slots = np.asarray(slots, dtype=np.int64)
+            return slots[np.lexsort((self._rank[slots], ~self._fav[slots]))]
+        rank = self._rank
+        return sorted(slots, key=lambda i: (not coins[i].favorite, rank[i]))
@@ -11,15 +11,18 @@ import os
 import sys
 import time
 import subprocess
+import threading
 
 from PyQt5.QtWidgets import (
     QApplication, QPushButton, QVBoxLayout, QWidget, QLabel, QLineEdit,
     QListWidget, QListWidgetItem, QCheckBox, QHBoxLayout, QMessageBox,
-    QGroupBox, QDialog
+    QGroupBox, QDialog, QSpinBox
 )
 from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QThread, pyqtSignal
 from playwright.async_api import async_playwright
 
+from ticker_snapshots import save_snapshot
+
 # ===================== НАСТРОЙКИ =====================
 
 # Путь к Chrome (проверь у друга)
@@ -36,6 +39,12 @@ CDP_USER_DATA_DIR = r"C:\ChromeTV"
 # Сколько ждать подъём CDP при автозапуске
 CDP_STARTUP_TIMEOUT_SEC = 20
 
+# Тёплая сессия: браузер и вкладки скринера живут между запусками парсера
+CDP_SESSION_IDLE_TIMEOUT_SEC = 600
+CDP_HEALTH_CHECK_TIMEOUT_SEC = 2
+
+SCREENER_URL = "https://ru.tradingview.com/cex-screener/"
+
 # --- Главный тумблер: нужен ли первый ручной вход сейчас? ---
 NEED_LOGIN_FIRST_TIME = False   # поставь True, если в этом профиле ещё не логинился
 
@@ -46,6 +55,13 @@ USE_HEADLESS_CHROME = False
 FAST_WAIT_MS = 250
 SLOW_WAIT_MS = 1200
 
+# Сколько ждать подтверждения выбора пункта фильтра (изменение DOM), мс
+FILTER_CONFIRM_TIMEOUT_MS = 1500
+
+# Параллельный режим: сколько вкладок скринера открывать одновременно (1 = как раньше)
+SCREENER_PARALLEL_TABS = 4
+SCREENER_MAX_TABS = 8
+
 # Таймауты (быстрый/медленный)
 NAV_TIMEOUT_MS_FAST = 40_000
 NAV_TIMEOUT_MS_SLOW = 90_000
@@ -175,27 +191,45 @@ class ParserThread(QThread):
     progress_signal = pyqtSignal(str)
     finished_signal = pyqtSignal()
     error_signal = pyqtSignal(str)
+    tickers_signal = pyqtSignal(list)  # конвейер: новые тикеры по мере прокрутки
 
-    def __init__(self, exchanges, types_, filename):
+    def __init__(self, exchanges, types_, filename, tabs=1, stream=False):
         super().__init__()
         self.exchanges = exchanges
         self.types_ = types_
         self.filename = filename
+        self.tabs = tabs
+        self.stream = stream
+        self._future = None
+        self._stopped = False
 
     def run(self):
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(tradingview_parser(
-                self.exchanges, self.types_, self.filename, self.progress_signal.emit
+            # корутина выполняется в фоновом loop'е тёплой CDP-сессии, поток просто ждёт результат
+            self._future = CDPSession.instance().submit(tradingview_parser(
+                self.exchanges, self.types_, self.filename, self.progress_signal.emit, self.tabs,
+                on_tickers=self.tickers_signal.emit if self.stream else None
             ))
+            if self._stopped:
+                self._future.cancel()
+            self._future.result()
             self.finished_signal.emit()
         except Exception as e:
             self.error_signal.emit(str(e))
 
+    def stop(self):
+        """Отменить разбор (окно закрыли): корутина в loop'е сессии получает CancelledError."""
+        self._stopped = True
+        if self._future is not None:
+            self._future.cancel()
+
 
 class TradingViewParserGUI(QDialog):
     finished = pyqtSignal()
+    # конвейер в сканер: открытый профиль подписывается на эти сигналы (см. CryptoApp.open_freak_parser)
+    stream_started = pyqtSignal()
+    tickers_found = pyqtSignal(list)
+    stream_finished = pyqtSignal()
 
     def __init__(self):
         super().__init__()
@@ -253,6 +287,23 @@ class TradingViewParserGUI(QDialog):
         b_all.clicked.connect(self.exlist.select_all); b_none.clicked.connect(self.exlist.deselect_all)
         buttons.addWidget(b_all); buttons.addWidget(b_none); lay.addLayout(buttons)
 
+        trow = QHBoxLayout()
+        trow.addWidget(QLabel("Параллельных вкладок:"))
+        self.tabs_spin = QSpinBox()
+        self.tabs_spin.setRange(1, SCREENER_MAX_TABS)
+        self.tabs_spin.setValue(SCREENER_PARALLEL_TABS)
+        self.tabs_spin.setToolTip("Биржи делятся на группы, каждая группа парсится в своей вкладке Chrome")
+        self.tabs_spin.setStyleSheet(
+            "QSpinBox{background:#3A3A3A;color:#DDD;border:1px solid #555;border-radius:4px;padding:6px 10px;font-size:13px;}")
+        trow.addWidget(self.tabs_spin)
+        trow.addStretch()
+        lay.addLayout(trow)
+
+        self.stream_check = QCheckBox("Сразу сканировать в открытый профиль")
+        self.stream_check.setToolTip("Тикеры уходят в сканер монет по мере прокрутки скринера, не дожидаясь TXT")
+        self.stream_check.setStyleSheet("QCheckBox{color:#DDD;font-size:13px;}")
+        lay.addWidget(self.stream_check)
+
         self.run_btn = QPushButton("Собрать список тикеров")
         self.run_btn.setStyleSheet("""
             QPushButton{background:#6A5AF9;color:#fff;border:none;padding:12px 20px;border-radius:6px;font-weight:bold;font-size:14px;}
@@ -332,13 +383,23 @@ class TradingViewParserGUI(QDialog):
         self.anim.setEndValue(g.adjusted(0, 5, 0, 5))
         self.anim.start()
 
-        self.thread = ParserThread(exchanges, types_, full_path)
+        self.streaming = self.stream_check.isChecked()
+        self.thread = ParserThread(exchanges, types_, full_path, self.tabs_spin.value(), self.streaming)
+        if self.streaming:
+            self.stream_started.emit()
+            self.thread.tickers_signal.connect(self.tickers_found.emit)
         self.thread.progress_signal.connect(self.log)
         self.thread.finished_signal.connect(self._ok)
         self.thread.error_signal.connect(self._err)
         self.thread.start()
 
+    def _close_stream(self):
+        if getattr(self, "streaming", False):
+            self.streaming = False
+            self.stream_finished.emit()
+
     def _ok(self):
+        self._close_stream()
         self.is_parsing = False
         self.run_btn.setEnabled(True)
         g = self.run_btn.geometry()
@@ -349,6 +410,7 @@ class TradingViewParserGUI(QDialog):
         QMessageBox.information(self, "Успех", "Парсинг завершён успешно!")
 
     def _err(self, msg):
+        self._close_stream()
         self.is_parsing = False
         self.run_btn.setEnabled(True)
         g = self.run_btn.geometry()
@@ -362,6 +424,18 @@ class TradingViewParserGUI(QDialog):
             QMessageBox.critical(self, "Ошибка", f"Произошла ошибка: {msg}")
 
     def closeEvent(self, e):
+        # окно закрыли посреди разбора: гасим поток и закрываем конвейер, иначе сканер ждёт тикеры вечно
+        thread = getattr(self, "thread", None)
+        if thread is not None and thread.isRunning():
+            for signal in (thread.progress_signal, thread.finished_signal, thread.error_signal, thread.tickers_signal):
+                try:
+                    signal.disconnect()
+                except TypeError:  # не был подключён
+                    pass
+            thread.stop()
+            thread.wait()
+            self.is_parsing = False
+        self._close_stream()
         self.finished.emit()
         e.accept()
 
@@ -374,7 +448,11 @@ def _build_chrome_cmd():
         CHROME_EXE,
         f"--remote-debugging-port={CDP_PORT}",
         f'--user-data-dir={CDP_USER_DATA_DIR}',
-        "--no-first-run", "--no-default-browser-check"
+        "--no-first-run", "--no-default-browser-check",
+        # фоновые вкладки не должны притормаживать (параллельный режим скринера)
+        "--disable-background-timer-throttling",
+        "--disable-backgrounding-occluded-windows",
+        "--disable-renderer-backgrounding"
     ]
     if USE_HEADLESS_CHROME:
         cmd.append("--headless=new")
@@ -480,6 +558,194 @@ async def _ensure_login_if_needed(page, log, fast_mode: bool):
     log("Не дождался подтверждения входа — продолжаю (возможно уже OK).")
 
 
+# ===================== CDP СЕССИЯ =====================
+
+class CDPSession:
+    """
+    Живая CDP-сессия между запусками парсера.
+    Держит свой event loop в фоновом потоке (объекты Playwright привязаны к loop'у),
+    подключение к Chrome и пул вкладок, заранее открытых на чистом скринере.
+    Закрывается сама после CDP_SESSION_IDLE_TIMEOUT_SEC простоя или через CDPSession.close() при выходе.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def close(cls):
+        """Закрыть сессию при выходе из приложения: loop живёт в daemon-потоке и сам Chrome не погасит."""
+        with cls._instance_lock:
+            session, cls._instance = cls._instance, None
+        if session is None:
+            return
+        try:
+            session.run(session.shutdown())
+        finally:
+            session._loop.call_soon_threadsafe(session._loop.stop)
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="cdp-session", daemon=True)
+        self._thread.start()
+
+        self._p = None
+        self.browser = None
+        self.context = None
+        self.launched = False
+        self.launched_proc = None
+        self.logged_in = False
+
+        self._warm = []          # [(page, задача пре-навигации)]
+        self._busy = 0
+        self._last_used = time.time()
+        self._watchdog = None
+        self._lock = None        # asyncio.Lock: ensure и shutdown не пересекаются (создаётся в loop'е сессии)
+
+    def submit(self, coro):
+        """Поставить корутину в loop сессии; возвращает concurrent.futures.Future (его можно отменить)."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro):
+        """Выполнить корутину в loop'е сессии (вызывается из QThread, блокирует до результата)."""
+        return self.submit(coro).result()
+
+    def begin(self):
+        self._busy += 1
+        self._last_used = time.time()
+
+    def end(self):
+        self._busy = max(0, self._busy - 1)
+        self._last_used = time.time()
+
+    def _guard(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _is_healthy(self):
+        if self.browser is None or self.context is None:
+            return False
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+    async def ensure(self, log):
+        """Проверяет живость браузера; при необходимости переподключается (или запускает Chrome)."""
+        async with self._guard():
+            await self._ensure(log)
+
+    async def _ensure(self, log):
+        if await self._is_healthy():
+            log("CDP-сессия жива — переиспользую браузер.")
+            return
+        if self.browser is not None:
+            log("CDP-сессия потеряна — переподключаюсь...")
+        await self._shutdown()
+
+        if self._p is None:
+            self._p = await async_playwright().start()
+        self.browser, self.context, self.launched, self.launched_proc = await _connect_or_launch_cdp(self._p, log)
+        self.logged_in = False
+
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.ensure_future(self._idle_watchdog())
+
+    async def _page_ok(self, page):
+        if page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("1"), CDP_HEALTH_CHECK_TIMEOUT_SEC)
+            return True
+        except Exception:
+            return False
+
+    async def acquire_pages(self, n, fast_mode: bool):
+        """n вкладок: сначала тёплые (уже на скринере), недостающие — новые."""
+        pages = []
+        while self._warm and len(pages) < n:
+            page, task = self._warm.pop(0)
+            try:
+                await task
+            except Exception:
+                pass
+            if await self._page_ok(page):
+                pages.append(page)
+            else:
+                await self._close_page(page)
+        while len(pages) < n:
+            page = await self.context.new_page()
+            page.set_default_timeout(SEL_TIMEOUT_MS_FAST if fast_mode else SEL_TIMEOUT_MS_SLOW)
+            page.set_default_navigation_timeout(NAV_TIMEOUT_MS_FAST if fast_mode else NAV_TIMEOUT_MS_SLOW)
+            pages.append(page)
+        return pages
+
+    async def release_pages(self, pages):
+        """Возвращает вкладки в пул и сразу в фоне перезагружает скринер (сброс фильтров) к следующему запуску."""
+        for page in pages:
+            if len(self._warm) >= SCREENER_MAX_TABS or page.is_closed():
+                await self._close_page(page)
+                continue
+            task = asyncio.ensure_future(page.goto(SCREENER_URL, wait_until="domcontentloaded"))
+            self._warm.append((page, task))
+
+    async def discard_pages(self, pages):
+        for page in pages:
+            await self._close_page(page)
+
+    async def _close_page(self, page):
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    async def _idle_watchdog(self):
+        while True:
+            await asyncio.sleep(5)
+            if self.browser is None:
+                return
+            if self._busy == 0 and time.time() - self._last_used > CDP_SESSION_IDLE_TIMEOUT_SEC:
+                async with self._guard():
+                    # пока ждали замок, мог стартовать запуск (begin() уже сделан) — тогда не гасим
+                    if self._busy == 0 and time.time() - self._last_used > CDP_SESSION_IDLE_TIMEOUT_SEC:
+                        await self._shutdown()
+                        return
+
+    async def shutdown(self):
+        """Закрывает тёплые вкладки; Chrome гасим, только если запускали его сами."""
+        async with self._guard():
+            await self._shutdown()
+
+    async def _shutdown(self):
+        warm, self._warm = self._warm, []
+        for page, task in warm:
+            task.cancel()
+            await self._close_page(page)
+        if self.launched:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+            _close_launched_chrome(self.launched_proc)
+        if self._p is not None:
+            try:
+                await self._p.stop()
+            except Exception:
+                pass
+        self._p = None
+        self.browser = None
+        self.context = None
+        self.launched = False
+        self.launched_proc = None
+        self.logged_in = False
+
+
 # ===================== ЛОГИКА СТРАНИЦЫ (селекторы как раньше) =====================
 
 async def _click_text_any(page, texts, timeout=3000):
@@ -491,13 +757,99 @@ async def _click_text_any(page, texts, timeout=3000):
             continue
     return False
 
-async def apply_exchange_filters_fast(page, exch, log, fast_mode: bool):
-    log("Открываю фильтр Биржа/Exchange...")
-    if not await _click_text_any(page, ["Биржа", "Exchange"], timeout=5000):
-        raise Exception("Не нашёл кнопку 'Биржа/Exchange'")
-
+# Выбор всех пунктов выпадающего фильтра за один evaluate.
+# Для каждого пункта: ищем строку списка (сначала точное совпадение текста), если её нет —
+# вписываем запрос в поиск через нативный setter (React видит input) и ждём, пока
+# MutationObserver не покажет нужную строку. Клик подтверждается изменением DOM строки.
+_SELECT_OPTIONS_JS = """
+async ({items, timeout}) => {
+    const OPTION = 'div.middle-LSK1huUA';
+    const input = document.querySelector('input[placeholder="Поиск"], input[placeholder="Search"]');
+    const setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+
+    const norm = (el) => el.textContent.replace(/\\s+/g, ' ').trim().toLowerCase();
+    const find = (labels, loose) => {
+        const opts = Array.from(document.querySelectorAll(OPTION));
+        for (const label of labels) {
+            const low = label.toLowerCase();
+            const hit = opts.find(o => norm(o) === low) || (loose && opts.find(o => norm(o).includes(low)));
+            if (hit) return hit;
+        }
+        return null;
+    };
+    // резолвится, как только predicate() вернёт значение (проверка на каждой мутации) или по таймауту
+    const waitFor = (predicate, root) => new Promise(resolve => {
+        const now = predicate();
+        if (now) return resolve(now);
+        const obs = new MutationObserver(() => {
+            const v = predicate();
+            if (v) { obs.disconnect(); clearTimeout(t); resolve(v); }
+        });
+        obs.observe(root, {subtree: true, childList: true, attributes: true, characterData: true});
+        const t = setTimeout(() => { obs.disconnect(); resolve(null); }, timeout);
+    });
+    const typeQuery = (q) => {
+        setValue.call(input, q);
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+    };
+    const press = (el) => {
+        const o = {bubbles: true, cancelable: true, view: window};
+        el.dispatchEvent(new PointerEvent('pointerdown', o));
+        el.dispatchEvent(new MouseEvent('mousedown', o));
+        el.dispatchEvent(new PointerEvent('pointerup', o));
+        el.dispatchEvent(new MouseEvent('mouseup', o));
+        el.dispatchEvent(new MouseEvent('click', o));
+    };
+
+    const results = {};
+    for (const item of items) {
+        const key = item.labels[0];
+        let opt = find(item.labels, false);
+        if (!opt && input && item.query) {
+            typeQuery(item.query);
+            opt = await waitFor(() => find(item.labels, true), document.body);
+        }
+        if (!opt) { results[key] = 'not_found'; continue; }
+
+        const row = opt.closest('[role="option"], [role="row"], li') || opt.parentElement || opt;
+        let changed = false;
+        const obs = new MutationObserver(() => { changed = true; });
+        obs.observe(row, {subtree: true, childList: true, attributes: true, characterData: true});
+        press(opt);
+        changed = changed || !!(await waitFor(() => changed || !row.isConnected, document.body));
+        obs.disconnect();
+        results[key] = changed ? 'ok' : 'unconfirmed';
+    }
+    if (input && input.value) typeQuery('');
+    return results;
+}
+"""
+
+async def _open_filter(page, button_texts, timeout=5000):
+    if not await _click_text_any(page, button_texts, timeout=timeout):
+        raise Exception(f"Не нашёл кнопку '{'/'.join(button_texts)}'")
+    # ждём сам список, а не фиксированную паузу
+    await page.wait_for_selector('div.middle-LSK1huUA, input[placeholder="Поиск"], input[placeholder="Search"]',
+                                 timeout=timeout)
+
+async def _select_options_in_page(page, items, fast_mode: bool):
+    """items: [{'labels': [варианты подписи], 'query': текст для поиска или None}] → {labels[0]: статус}."""
+    return await page.evaluate(_SELECT_OPTIONS_JS, {
+        "items": items,
+        "timeout": FILTER_CONFIRM_TIMEOUT_MS if fast_mode else FILTER_CONFIRM_TIMEOUT_MS * 3,
+    })
+
+def _log_selection(log, what, results, started):
+    ok = sum(1 for v in results.values() if v == "ok")
+    log(f"{what}: выбрано {ok}/{len(results)} за {time.time() - started:.2f} сек")
+    for name, status in results.items():
+        if status == "unconfirmed":
+            log(f"{what}: клик по '{name}' без подтверждения в DOM")
+
+async def _select_exchanges_by_typing(page, names, log, fast_mode: bool):
+    """Старый поштучный способ — запасной путь для бирж, которые не нашлись в списке."""
     search_input = await page.wait_for_selector('input[placeholder="Поиск"], input[placeholder="Search"]', timeout=5000)
-    for name in exch:
+    for name in names:
         await search_input.click(click_count=3)
         await search_input.press('Backspace')
         await search_input.type(name, delay=0 if fast_mode else 50)
@@ -508,22 +860,44 @@ async def apply_exchange_filters_fast(page, exch, log, fast_mode: bool):
             log(f"Не получилось выбрать биржу {name}: {e}")
         await page.wait_for_timeout(FAST_WAIT_MS if fast_mode else 300)
 
+async def apply_quote_currency_filter_fast(page, log, fast_mode: bool):
+    log("Выбираю 'Котируемая валюта / Quote currency'...")
+    started = time.time()
+    await _open_filter(page, ["Котируемая валюта", "Quote currency"])
+    results = await _select_options_in_page(page, [{"labels": ["Tether USDt", "USDT"], "query": "USDT"}], fast_mode)
+    _log_selection(log, "Котируемая валюта", results, started)
+    if results.get("Tether USDt") == "not_found":
+        log("Не удалось выбрать USDT")
+
+async def apply_exchange_filters_fast(page, exch, log, fast_mode: bool):
+    log("Открываю фильтр Биржа/Exchange...")
+    started = time.time()
+    await _open_filter(page, ["Биржа", "Exchange"])
+
+    results = await _select_options_in_page(page, [{"labels": [n], "query": n} for n in exch], fast_mode)
+    missing = [n for n, status in results.items() if status == "not_found"]
+    if missing:
+        log(f"Не нашлись в списке ({', '.join(missing)}) — пробую поштучно")
+        await _select_exchanges_by_typing(page, missing, log, fast_mode)
+    _log_selection(log, "Биржи", results, started)
+
     await page.keyboard.press('Escape')
     log("Все биржи выбраны успешно!")
 
 async def apply_instrument_type_filters_fast(page, types_, log, fast_mode: bool):
     log("Открываю фильтр Тип инструмента/Instrument type...")
-    if not await _click_text_any(page, ["Тип инструмента", "Instrument type"], timeout=5000):
-        raise Exception("Не нашёл кнопку 'Тип инструмента/Instrument type'")
-    await page.wait_for_timeout(FAST_WAIT_MS if fast_mode else 1000)
+    started = time.time()
+    await _open_filter(page, ["Тип инструмента", "Instrument type"])
 
-    for t in types_:
-        try:
-            await page.click(f'div.middle-LSK1huUA:has-text("{t}")', timeout=2000)
-            log(f"Тип инструмента {t} выбран успешно")
-        except Exception as e:
-            log(f"Не удалось выбрать тип инструмента {t}: {e}")
-        await page.wait_for_timeout(FAST_WAIT_MS if fast_mode else 200)
+    results = await _select_options_in_page(page, [{"labels": [t], "query": None} for t in types_], fast_mode)
+    for t, status in results.items():
+        if status == "not_found":
+            try:
+                await page.click(f'div.middle-LSK1huUA:has-text("{t}")', timeout=2000)
+                log(f"Тип инструмента {t} выбран успешно")
+            except Exception as e:
+                log(f"Не удалось выбрать тип инструмента {t}: {e}")
+    _log_selection(log, "Типы инструментов", results, started)
 
     await page.keyboard.press('Escape')
     log("Все типы инструментов выбраны успешно!")
@@ -546,8 +920,22 @@ async def _fail_if_no_symbols(page, log, exchanges, types_):
         raise Exception(f"NO_DATA:{msg}")
 
 # СТАРАЯ ЛОГИКА: докручиваем строго до data-matches
-async def scroll_table_to_bottom_fast(page, log, fast_mode: bool):
-    """Прокручивает таблицу до конца, строго до total_matches из data-matches (как было раньше)."""
+# Количество строк и тикеры строк, появившихся начиная с индекса from (строки только дописываются в конец)
+_ROWS_SINCE_JS = '''(from) => {
+    const rows = document.querySelectorAll('.row-RdUXZpkv.listRow');
+    const names = [];
+    for (let i = from; i < rows.length; i++) {
+        const el = rows[i].querySelector('.tickerName-GrtoTeat');
+        if (el) names.push(el.textContent);
+    }
+    return {count: rows.length, names: names};
+}'''
+
+async def scroll_table_to_bottom_fast(page, log, fast_mode: bool, on_tickers=None):
+    """
+    Прокручивает таблицу до конца, строго до total_matches из data-matches (как было раньше).
+    on_tickers(list) — потоковый режим: новые тикеры отдаются сразу по мере подгрузки строк.
+    """
     log("Начинаем прокрутку таблицы...")
 
     total_matches = await page.evaluate('''() => {
@@ -585,9 +973,15 @@ async def scroll_table_to_bottom_fast(page, log, fast_mode: bool):
     current_count = 0
 
     while scroll_attempts < max_scroll_attempts:
-        current_count = await page.evaluate('''() => {
-            return document.querySelectorAll('.row-RdUXZpkv.listRow').length;
-        }''')
+        if on_tickers is None:
+            current_count = await page.evaluate('''() => {
+                return document.querySelectorAll('.row-RdUXZpkv.listRow').length;
+            }''')
+        else:
+            fresh = await page.evaluate(_ROWS_SINCE_JS, last_count)
+            current_count = fresh["count"]
+            if fresh["names"]:
+                on_tickers(fresh["names"])
 
         log(f"Текущее количество тикеров: {current_count}")
 
@@ -622,141 +1016,179 @@ async def scroll_table_to_bottom_fast(page, log, fast_mode: bool):
 
 # ===================== ОСНОВНОЙ ПАРСЕР =====================
 
-async def tradingview_parser(exchange_names, instrument_types, filename, log):
-    async with async_playwright() as p:
-        browser = None
-        context = None
-        page = None
-        launched = False
-        launched_proc = None
-
-        fast_mode = not NEED_LOGIN_FIRST_TIME
-
-        try:
-            # 1) attach (или автозапуск Chrome)
-            browser, context, launched, launched_proc = await _connect_or_launch_cdp(p, log)
-            page = await context.new_page()
-            page.set_default_timeout(SEL_TIMEOUT_MS_FAST if fast_mode else SEL_TIMEOUT_MS_SLOW)
-            page.set_default_navigation_timeout(NAV_TIMEOUT_MS_FAST if fast_mode else NAV_TIMEOUT_MS_SLOW)
-            try:
-                await page.bring_to_front()
-            except Exception:
-                pass
-
-            # 2) первый вход (если требуется)
-            await _ensure_login_if_needed(page, log, fast_mode)
+def _split_exchanges(exchange_names, tabs):
+    """Раскладывает биржи по вкладкам по кругу (крупные биржи не попадают в одну группу подряд)."""
+    tabs = max(1, min(int(tabs or 1), len(exchange_names)))
+    groups = [[] for _ in range(tabs)]
+    for i, name in enumerate(exchange_names):
+        groups[i % tabs].append(name)
+    return [g for g in groups if g]
 
-            # 3) идём в скринер
-            log("Открываю CEX-скринер...")
-            await page.goto(
-                "https://ru.tradingview.com/cex-screener/",
-                timeout=(NAV_TIMEOUT_MS_FAST if fast_mode else NAV_TIMEOUT_MS_SLOW),
-                wait_until="domcontentloaded"
-            )
+def _close_launched_chrome(launched_proc):
+    try:
+        if launched_proc and launched_proc.poll() is None:
+            if os.name == "nt":
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(launched_proc.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                launched_proc.terminate()
+    except Exception:
+        pass
 
-            # 4) Котируемая валюта → USDT
-            log("Выбираю 'Котируемая валюта / Quote currency'...")
-            if not await _click_text_any(page, ["Котируемая валюта", "Quote currency"], timeout=5000):
-                raise Exception("Не нашёл кнопку 'Котируемая валюта/Quote currency'")
+async def _scrape_screener_tickers(page, exchange_names, instrument_types, log, fast_mode: bool, on_tickers=None):
+    """Один запрос к скринеру в своей вкладке: USDT + биржи + типы → прокрутка → список тикеров."""
+    # 3) идём в скринер (тёплая вкладка из пула сессии уже стоит на чистом скринере)
+    if page.url.startswith(SCREENER_URL):
+        log("CEX-скринер уже открыт (тёплая вкладка).")
+    else:
+        log("Открываю CEX-скринер...")
+        await page.goto(
+            SCREENER_URL,
+            timeout=(NAV_TIMEOUT_MS_FAST if fast_mode else NAV_TIMEOUT_MS_SLOW),
+            wait_until="domcontentloaded"
+        )
 
-            await page.type('input[placeholder="Поиск"], input[placeholder="Search"]', 'USDT',
-                            delay=0 if fast_mode else 70)
-            await page.wait_for_timeout(FAST_WAIT_MS if fast_mode else 900)
+    # 4) Котируемая валюта → USDT
+    await apply_quote_currency_filter_fast(page, log, fast_mode)
 
-            try:
-                await page.click('div.middle-LSK1huUA:has-text("Tether USDt")', timeout=3000)
-            except Exception:
-                try:
-                    await page.click('div.middle-LSK1huUA:has-text("USDT")', timeout=2000)
-                except Exception as e:
-                    log(f"Не удалось выбрать USDT: {e}")
-
-            # 5) фильтры
-            await apply_exchange_filters_fast(page, exchange_names, log, fast_mode)
-            await apply_instrument_type_filters_fast(page, instrument_types, log, fast_mode)
-
-            # 6) проверка «Нет подходящих символов»
-            await page.wait_for_timeout(FAST_WAIT_MS if fast_mode else 1200)
-            await _fail_if_no_symbols(page, log, exchange_names, instrument_types)
-
-            # 7) ждём появления строк и скроллим до total_matches
-            await page.wait_for_selector(
-                '.row-RdUXZpkv.listRow',
-                timeout=(SEL_TIMEOUT_MS_FAST if fast_mode else SEL_TIMEOUT_MS_SLOW)
-            )
+    # 5) фильтры
+    await apply_exchange_filters_fast(page, exchange_names, log, fast_mode)
+    await apply_instrument_type_filters_fast(page, instrument_types, log, fast_mode)
 
-            await scroll_table_to_bottom_fast(page, log, fast_mode)
-
-            # 8) парс тикеров
-            log("Парсю тикеры...")
-            tickers = await page.evaluate('''() => {
-                const out=[];
-                document.querySelectorAll('.row-RdUXZpkv.listRow').forEach(r=>{
-                    const el=r.querySelector('.tickerName-GrtoTeat');
-                    if(el) out.push(el.textContent);
-                });
-                return out;
-            }''')
-            log(f"Найдено {len(tickers)} тикеров")
+    # 6) проверка «Нет подходящих символов»
+    await page.wait_for_timeout(FAST_WAIT_MS if fast_mode else 1200)
+    await _fail_if_no_symbols(page, log, exchange_names, instrument_types)
 
-            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
-            with open(filename, 'w', encoding='utf-8') as f:
-                for t in tickers:
-                    f.write(t + "\n")
-            log(f"Тикеры сохранены: {filename}")
+    # 7) ждём появления строк и скроллим до total_matches
+    await page.wait_for_selector(
+        '.row-RdUXZpkv.listRow',
+        timeout=(SEL_TIMEOUT_MS_FAST if fast_mode else SEL_TIMEOUT_MS_SLOW)
+    )
 
-            # 9) Закрытие
-            try:
-                await page.close()
-            except Exception:
-                pass
+    await scroll_table_to_bottom_fast(page, log, fast_mode, on_tickers)
+
+    # 8) парс тикеров
+    log("Парсю тикеры...")
+    tickers = await page.evaluate('''() => {
+        const out=[];
+        document.querySelectorAll('.row-RdUXZpkv.listRow').forEach(r=>{
+            const el=r.querySelector('.tickerName-GrtoTeat');
+            if(el) out.push(el.textContent);
+        });
+        return out;
+    }''')
+    log(f"Найдено {len(tickers)} тикеров")
+    if on_tickers is not None:
+        on_tickers(tickers)
+    return tickers
+
+async def _scrape_shard(idx, page, exchange_names, instrument_types, log, fast_mode: bool, on_tickers=None):
+    """Шард для параллельного режима: NO_DATA по своей группе бирж — не ошибка, а пустой результат."""
+    shard_log = log if idx is None else (lambda m: log(f"[вкладка {idx + 1}] {m}"))
+    try:
+        return await _scrape_screener_tickers(page, exchange_names, instrument_types, shard_log, fast_mode,
+                                              on_tickers)
+    except Exception as e:
+        if idx is None:
+            raise
+        if "NO_DATA:" in str(e):
+            shard_log(f"Нет тикеров для: {', '.join(exchange_names)}")
+            return []
+        try:
+            await page.screenshot(path=f'error_screenshot_{idx + 1}.png')
+        except Exception:
+            pass
+        raise
 
-            # Если запускали Chrome сами — закрываем его
-            if launched:
-                log("Закрываю запущенный Chrome...")
-                try:
-                    await browser.close()
-                except Exception:
-                    pass
-                try:
-                    if launched_proc and launched_proc.poll() is None:
-                        if os.name == "nt":
-                            subprocess.run(["taskkill", "/F", "/T", "/PID", str(launched_proc.pid)],
-                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                        else:
-                            launched_proc.terminate()
-                except Exception:
-                    pass
-            else:
-                log("Chrome был уже запущен — оставляю как есть.")
+async def tradingview_parser(exchange_names, instrument_types, filename, log, tabs=1, session=None,
+                             on_tickers=None):
+    """
+    tabs > 1 — параллельный режим: биржи делятся на группы, каждая группа идёт
+    отдельным запросом скринера в своей вкладке, результаты сливаются без дублей.
+    on_tickers(list) — конвейер: каждый найденный тикер отдаётся один раз, как только появился в таблице.
+    Выполняется в loop'е CDPSession: браузер и вкладки остаются тёплыми для следующего запуска.
+    """
+    session = session or CDPSession.instance()
+    streamed = set()
+
+    def _stream(names):
+        fresh = [t for t in dict.fromkeys(names) if t not in streamed]
+        if fresh:
+            streamed.update(fresh)
+            on_tickers(fresh)
+
+    stream = _stream if on_tickers is not None else None
+    fast_mode = not NEED_LOGIN_FIRST_TIME
+    groups = _split_exchanges(exchange_names, tabs)
+    pages = []
+    t0 = time.time()
+
+    session.begin()
+    try:
+        # 1) живая сессия (или attach / автозапуск Chrome)
+        await session.ensure(log)
+        pages = await session.acquire_pages(len(groups), fast_mode)
+        try:
+            await pages[0].bring_to_front()
+        except Exception:
+            pass
 
-            log("Готово.")
+        # 2) первый вход / прогрев домена — один раз на сессию, до работы остальных вкладок
+        if not session.logged_in:
+            await _ensure_login_if_needed(pages[0], log, fast_mode)
+            session.logged_in = True
+        log(f"Сессия готова за {time.time() - t0:.2f} сек")
 
+        # 3-8) скринер: одна вкладка или по вкладке на группу бирж
+        if len(groups) == 1:
+            tickers = await _scrape_shard(None, pages[0], groups[0], instrument_types, log, fast_mode, stream)
+        else:
+            log(f"Параллельный режим: {len(groups)} вкладок")
+            parts = await asyncio.gather(*[
+                _scrape_shard(i, pages[i], group, instrument_types, log, fast_mode, stream)
+                for i, group in enumerate(groups)
+            ], return_exceptions=True)
+            # ждём все вкладки, чтобы не закрыть страницы под работающими шардами
+            errors = [x for x in parts if isinstance(x, BaseException)]
+            if errors:
+                raise errors[0]
+            # слияние без дублей, порядок — как в выдаче вкладок
+            tickers = list(dict.fromkeys(t for part in parts for t in part))
+            if not tickers:
+                msg = f"На выбранных биржах ({', '.join(exchange_names)}) нет инструментов для типов: {', '.join(instrument_types)}"
+                raise Exception(f"NO_DATA:{msg}")
+            log(f"Всего уникальных тикеров: {len(tickers)}")
+
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            for t in tickers:
+                f.write(t + "\n")
+        log(f"Тикеры сохранены: {filename}")
+
+        # версия списка + разница с прошлым запуском (сканер может взять только новые)
+        try:
+            diff = save_snapshot(filename, tickers)
+            if diff.has_previous:
+                log(f"Изменения с прошлого запуска: +{len(diff.added)} / -{len(diff.removed)}")
         except Exception as e:
-            log(f"Ошибка: {e}")
-            try:
-                if page:
-                    await page.screenshot(path='error_screenshot.png')
-            except Exception:
-                pass
+            log(f"Не удалось сохранить снапшот тикеров: {e}")
 
-            # В случае ошибки тоже закрываем наш Chrome, если запускали
-            try:
-                if launched:
-                    try:
-                        await browser.close()
-                    except Exception:
-                        pass
-                    if launched_proc and launched_proc.poll() is None:
-                        if os.name == "nt":
-                            subprocess.run(["taskkill", "/F", "/T", "/PID", str(launched_proc.pid)],
-                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                        else:
-                            launched_proc.terminate()
-            except Exception:
-                pass
+        # 9) вкладки — обратно в пул (браузер не закрываем, его погасит простой сессии)
+        await session.release_pages(pages)
+        pages = []
+        log("Готово.")
 
-            raise
+    except (Exception, asyncio.CancelledError) as e:
+        log(f"Ошибка: {e}")
+        try:
+            if pages:
+                await pages[0].screenshot(path='error_screenshot.png')
+        except Exception:
+            pass
+        await session.discard_pages(pages)
+        raise
+    finally:
+        session.end()
 
 
 # ===================== ENTRY =====================
@@ -7,22 +7,44 @@ import re
 import subprocess
 import traceback
 import time
+STARTUP_T0 = time.perf_counter()  # точка отсчёта фаз запуска (до тяжёлых импортов)
+import logging
 from pathlib import Path
 from PyQt5.QtWidgets import *
 from PyQt5.QtWidgets import QCompleter, QTabWidget, QInputDialog, QSizePolicy, QGraphicsOpacityEffect
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPoint, QPointF, QPropertyAnimation, QEvent, QSize, QSettings, QEasingCurve, QTimer
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPoint, QPointF, QPropertyAnimation, QEvent, QSize, QSettings, QEasingCurve, QTimer, QStringListModel
 from PyQt5.QtGui import (QIcon, QFont, QPalette, QColor, QStandardItemModel,
                          QStandardItem, QKeySequence, QPainter, QPixmap,
                          QLinearGradient, QBrush, QPen, QPolygonF)
 from database_sqlite import Database, Coin
-from parser import TradingViewParser
+from coin_table import CoinTableModel, CoinSortProxy, CoinDelegate, COL_COIN
 import multiprocessing
-from parser import parse_coin_in_process, parse_coins_batch_process
 import io
-from clicker_window import ClickerWindow
+import ticker_snapshots
 from datetime import datetime, timedelta
-import concurrent.futures
 import math
+import itertools
+import queue
+import threading
+
+# Фазы запуска и первой загрузки профиля — в тот же лог, что и парсер
+startup_log = logging.getLogger('Startup')
+startup_log.setLevel(logging.INFO)
+
+if not startup_log.handlers:
+    file_handler = logging.FileHandler("crypto_scanner.log", encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    startup_log.addHandler(file_handler)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    startup_log.addHandler(console_handler)
+
+
+def log_phase(title, start):
+    """Записать длительность фазы запуска (от start, time.perf_counter())."""
+    startup_log.info("%s: %.0f мс", title, (time.perf_counter() - start) * 1000)
+
 
 # --- безопасная обёртка stdout/stderr ---
 def _safe_rewrap_streams():
@@ -54,6 +76,30 @@ sys.excepthook = excepthook
 import cleanup_threads
 cleanup_threads.register_cleanup()
 
+# Тяжёлые подсистемы грузятся при первом использовании, а не при старте:
+#   parser (Playwright)              — ParseThread / BatchParseThread / --worker;
+#   clicker_window (pyautogui, pynput, QtMultimedia) — open_clicker;
+#   concurrent.futures (пул процессов) — BatchParseThread (ядро с Future уже нужно писателю БД);
+#   setup_playwright                 — ensure_playwright() перед первым сканированием или Freak Parser.
+# python main.py --startup-profile — разбивка времени импорта и фаз запуска.
+STARTUP_LAZY_MODULES = ("parser", "playwright", "clicker_window", "pyautogui", "pynput",
+                        "PyQt5.QtMultimedia", "concurrent.futures.process")
+
+_playwright_ready = None
+
+
+def ensure_playwright():
+    """setup_playwright один раз за запуск — перед первым использованием Playwright."""
+    global _playwright_ready
+    if _playwright_ready is None:
+        start = time.perf_counter()
+        _playwright_ready = setup_playwright()
+        log_phase("setup_playwright", start)
+        if not _playwright_ready:
+            print("Не удалось настроить Playwright. Приложение может работать некорректно.")
+    return _playwright_ready
+
+
 # Настройка окружения для Playwright
 def setup_playwright():
     if getattr(sys, 'frozen', False):
@@ -244,21 +290,50 @@ class ExchangeFilterWidget(QWidget):
         self.all_exchanges = []
 
     def set_exchanges(self, exchanges):
+        """exchanges — имена или {биржа: число монет} (число показывается рядом с именем). Отмечаются все."""
+        self._fill(exchanges, set(exchanges))
+
+    def update_exchanges(self, counts):
+        """
+        Обновить список из {биржа: число монет}, сохранив выбор пользователя: новые биржи отмечаются,
+        только если были отмечены все. Возвращает True, если изменился сам набор бирж.
+        """
+        if self.dialog.isVisible():
+            return False  # не трогаем список, пока в нём ставят галочки
+        old = set(self.all_exchanges)
+        if set(counts) == old:
+            for i in range(self.list_widget.count()):
+                item = self.list_widget.item(i)
+                name = item.data(Qt.UserRole)
+                item.setText(self._item_text(name, counts[name]))
+            return False
+        everything = bool(old) and self.selected_exchanges >= old
+        self._fill(counts, {ex for ex in counts
+                            if ex in self.selected_exchanges or (everything and ex not in old)})
+        return True
+
+    @staticmethod
+    def _item_text(name, count):
+        return name if count is None else f"{name} ({count})"
+
+    def _fill(self, exchanges, selected):
+        counts = exchanges if isinstance(exchanges, dict) else {}
         self.all_exchanges = sorted(exchanges)
         self.list_widget.clear()
         for exchange in self.all_exchanges:
-            item = QListWidgetItem(exchange)
+            item = QListWidgetItem(self._item_text(exchange, counts.get(exchange)))
+            item.setData(Qt.UserRole, exchange)
             item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-            item.setCheckState(Qt.Checked)
+            item.setCheckState(Qt.Checked if exchange in selected else Qt.Unchecked)
             self.list_widget.addItem(item)
-        self.selected_exchanges = set(self.all_exchanges)
+        self.selected_exchanges = set(selected)
         self.update_label()
 
     def filter_items(self, text):
         text_lower = text.strip().lower()
         for i in range(self.list_widget.count()):
             item = self.list_widget.item(i)
-            item_text = item.text().lower()
+            item_text = item.data(Qt.UserRole).lower()
             item.setHidden(text_lower not in item_text)
 
     def select_all(self):
@@ -274,7 +349,7 @@ class ExchangeFilterWidget(QWidget):
     def show_dialog(self, event=None):
         for i in range(self.list_widget.count()):
             item = self.list_widget.item(i)
-            if item.text() in self.selected_exchanges:
+            if item.data(Qt.UserRole) in self.selected_exchanges:
                 item.setCheckState(Qt.Checked)
             else:
                 item.setCheckState(Qt.Unchecked)
@@ -287,7 +362,7 @@ class ExchangeFilterWidget(QWidget):
         for i in range(self.list_widget.count()):
             item = self.list_widget.item(i)
             if item.checkState() == Qt.Checked:
-                self.selected_exchanges.add(item.text())
+                self.selected_exchanges.add(item.data(Qt.UserRole))
         self.update_label()
         self.dialog.accept()
 
@@ -316,6 +391,10 @@ class ExchangeFilterWidget(QWidget):
     def get_selected_items(self):
         return list(self.selected_exchanges)
 
+    def clear_selection(self):
+        self.selected_exchanges.clear()
+        self.update_label()
+
 
 class ParseThread(QThread):
     finished = pyqtSignal(dict)
@@ -329,6 +408,7 @@ class ParseThread(QThread):
 
     def run(self):
         try:
+            from parser import TradingViewParser
             self.parser = TradingViewParser(headless=True, instance_id=self.thread_id)
             data_tuple = self.parser.parse_coin(self.coin_name)
             data = data_tuple[1] if isinstance(data_tuple, tuple) and len(data_tuple) == 2 else data_tuple
@@ -344,8 +424,13 @@ class BatchParseThread(QThread):
     progress = pyqtSignal(int, int, str, str)  # current, total, coin, time_remaining
     finished = pyqtSignal()
     error = pyqtSignal(str, str)
+    saved = pyqtSignal(object)  # имена монет пачки — после её коммита (живое обновление таблицы)
 
-    def __init__(self, coin_names, db, thread_id, max_workers=5):
+    # Потоковый режим (конвейер из Freak Parser): монеты дописываются через feed() во время работы
+    STREAM_CHUNK_SIZE = 10
+    STREAM_FLUSH_SEC = 1.0
+
+    def __init__(self, coin_names, db, thread_id, max_workers=5, stream=False):
         super().__init__()
         self.coin_names = coin_names
         self.db = db
@@ -355,6 +440,31 @@ class BatchParseThread(QThread):
         self.max_workers = max_workers
         self._executor = None
         self._futures = []
+        self._stream = stream
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        self._feed_closed = not stream
+        self._processed = 0
+        if stream and coin_names:
+            self.feed(coin_names)
+
+    def feed(self, coin_names):
+        """Добавить монеты в очередь (потоковый режим). Уже поставленные в очередь — пропускаются."""
+        with self._queued_lock:
+            fresh = [n for n in dict.fromkeys(coin_names) if n and n not in self._queued]
+            self._queued.update(fresh)
+        for name in fresh:
+            self._queue.put(name)
+        return len(fresh)
+
+    def close_feed(self):
+        """Больше монет не будет: после обработки очереди поток завершится."""
+        self._feed_closed = True
+
+    def queued_count(self):
+        with self._queued_lock:
+            return len(self._queued)
 
     def cancel(self):
         self._is_cancelled = True
@@ -364,9 +474,45 @@ class BatchParseThread(QThread):
         except Exception:
             pass
 
+    def _handle_chunk_results(self, chunk_results, total):
+        # вся пачка — одной транзакцией, а не commit на каждую монету
+        saved = []
+        with self.db.write_session():
+            for coin_name, result in chunk_results.items():
+                self._processed += 1
+                processed = self._processed
+                elapsed = time.time() - self.start_time
+                time_per_coin = elapsed / max(processed, 1)
+                remaining_seconds = max(0, time_per_coin * (total - processed))
+                hours = int(remaining_seconds // 3600)
+                minutes = int((remaining_seconds % 3600) // 60)
+                seconds = int(remaining_seconds % 60)
+                remaining_time = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+                if "error" in result:
+                    self.error.emit(result["error"], coin_name)
+                else:
+                    spot_str = ", ".join(result['spot']) if result['spot'] else ""
+                    futures_str = ", ".join(result['futures']) if result['futures'] else ""
+                    self.db.save_coin(result['name'], spot_str, futures_str)
+                    saved.append(result['name'])
+
+                self.progress.emit(processed, total, coin_name, remaining_time)
+        if saved:
+            self.saved.emit(saved)
+
     def run(self):
-        total = len(self.coin_names)
         self.start_time = time.time()
+        if self._stream:
+            self._run_stream()
+        else:
+            self._run_batch()
+        self.finished.emit()
+
+    def _run_batch(self):
+        import concurrent.futures
+        from parser import parse_coins_batch_process
+        total = len(self.coin_names)
 
         chunk_size = max(1, len(self.coin_names) // self.max_workers)
         chunks = [self.coin_names[i:i + chunk_size] for i in range(0, len(self.coin_names), chunk_size)]
@@ -376,40 +522,162 @@ class BatchParseThread(QThread):
             self._executor = executor
             self._futures = [executor.submit(parse_coins_batch_process, chunk, True) for chunk in chunks]
 
-            processed = 0
             for future in concurrent.futures.as_completed(self._futures):
                 if self._is_cancelled:
                     break
                 chunk = None
                 try:
-                    chunk_results = future.result()
-                    for coin_name, result in chunk_results.items():
-                        processed += 1
-                        elapsed = time.time() - self.start_time
-                        time_per_coin = elapsed / max(processed, 1)
-                        remaining_seconds = max(0, time_per_coin * (total - processed))
-                        hours = int(remaining_seconds // 3600)
-                        minutes = int((remaining_seconds % 3600) // 60)
-                        seconds = int(remaining_seconds % 60)
-                        remaining_time = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-
-                        if "error" in result:
-                            self.error.emit(result["error"], coin_name)
-                        else:
-                            spot_str = ", ".join(result['spot']) if result['spot'] else ""
-                            futures_str = ", ".join(result['futures']) if result['futures'] else ""
-                            self.db.save_coin(result['name'], spot_str, futures_str)
-
-                        self.progress.emit(processed, total, coin_name, remaining_time)
+                    self._handle_chunk_results(future.result(), total)
                 except Exception as e:
                     # Если батч упал — считаем, что все его монеты с ошибкой
                     if chunk is None:
                         # без точного chunk — просто продвинем счётчик
-                        processed += 1
-                        self.progress.emit(processed, total, "?", "Ошибка батча")
+                        self._processed += 1
+                        self.progress.emit(self._processed, total, "?", "Ошибка батча")
                     self.error.emit(str(e), "batch")
 
-        self.finished.emit()
+    def _run_stream(self):
+        """Монеты приходят во время работы: режем очередь на маленькие пачки и сразу отдаём воркерам."""
+        import concurrent.futures
+        from parser import parse_coins_batch_process
+        ctx = multiprocessing.get_context('spawn')
+        pending = set()
+        buffer = []
+        last_submit = time.time()
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx) as executor:
+            self._executor = executor
+            while not self._is_cancelled:
+                while True:
+                    try:
+                        buffer.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                closed = self._feed_closed and self._queue.empty()
+                due = time.time() - last_submit >= self.STREAM_FLUSH_SEC
+                while buffer and (len(buffer) >= self.STREAM_CHUNK_SIZE or closed or due):
+                    chunk, buffer = buffer[:self.STREAM_CHUNK_SIZE], buffer[self.STREAM_CHUNK_SIZE:]
+                    pending.add(executor.submit(parse_coins_batch_process, chunk, True))
+                    last_submit = time.time()
+
+                if closed and not buffer and not pending:
+                    break
+                if not pending:
+                    time.sleep(0.1)
+                    continue
+
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=0.2, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    total = self.queued_count()
+                    try:
+                        self._handle_chunk_results(future.result(), total)
+                    except Exception as e:
+                        self.error.emit(str(e), "batch")
+
+
+class ProfileBackupThread(QThread):
+    """Онлайн-копия профиля через backup API SQLite: профиль остаётся рабочим, пока идёт копия."""
+    progress = pyqtSignal(int, int)  # скопировано страниц, всего страниц
+    finished = pyqtSignal(str)       # путь к готовому файлу
+    error = pyqtSignal(str)
+
+    def __init__(self, db, mode, target=None):
+        super().__init__()
+        self.db = db
+        self.mode = mode        # "copy" (target — имя профиля), "export" (target — путь), "snapshot"
+        self.target = target
+
+    def run(self):
+        try:
+            report = lambda done, total: self.progress.emit(done, total)
+            if self.mode == "copy":
+                new_db = self.db.copy_profile(self.target, report)
+                path = new_db.filename
+                new_db.close()
+            elif self.mode == "export":
+                path = self.db.export_profile(self.target, report)
+            else:
+                path = self.db.snapshot_profile(report)
+            self.finished.emit(path)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+FILTER_DEBOUNCE_MS = 150   # пауза после ввода в поиске, прежде чем фильтровать
+LIVE_UPDATE_MS = 100       # как часто таблица забирает монеты, сохранённые сканированием
+LIVE_UPDATE_BUDGET_S = 0.008   # сколько GUI-потока на один такой шаг; остальное — на следующем
+LIVE_UPDATE_STEP = 16      # монет за одну проверку фильтром
+
+
+class FilterThread(QThread):
+    """
+    Фильтр вкладки вне GUI-потока. Живёт всё время жизни вкладки и считает только последний запрос:
+    новый запрос отменяет текущий (проверка между этапами фильтра), устаревшие результаты не отправляются.
+    """
+    ready = pyqtSignal(int, object, object)   # номер запроса, список Coin, {биржа: число монет}
+    error = pyqtSignal(int, str)
+    synced = pyqtSignal(object)               # {биржа: число монет} после request_sync()
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self._cond = threading.Condition()
+        self._pending = None     # (номер, параметры ExchangeIndex.filter)
+        self._latest = 0
+        self._sync = False
+        self._stopped = False
+
+    def request_sync(self):
+        """Скан закончился: дождаться коммита его записей и пересчитать биржи — здесь, а не в GUI."""
+        with self._cond:
+            self._sync = True
+            self._cond.notify()
+
+    def submit(self, generation, query):
+        with self._cond:
+            self._pending = (generation, query)
+            self._latest = generation
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self.wait(2000)
+
+    def _superseded(self, generation):
+        return self._stopped or generation != self._latest
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._sync and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                sync, self._sync = self._sync, False
+                job, self._pending = self._pending, None
+            if sync:
+                try:
+                    self.db.reload_from_file()     # flush писателей профиля и каталога
+                    self.synced.emit(self.db.exchange_index().exchange_counts())
+                except Exception as e:
+                    print(f"Ошибка синхронизации после сканирования: {e}")
+            if job is None:
+                continue
+            generation, query = job
+            try:
+                index = self.db.exchange_index()   # первый запрос вкладки строит индекс здесь, не в GUI
+                if query["exchanges"] is None:
+                    query = dict(query, exchanges=index.exchanges())   # "все биржи профиля"
+                coins = index.filter(cancelled=lambda: self._superseded(generation), **query)
+                if coins is not None and not self._superseded(generation):
+                    self.ready.emit(generation, coins, index.exchange_counts())
+            except Exception as e:
+                self.error.emit(generation, str(e))
 
 
 class ProfileTab(QWidget):
@@ -419,8 +687,17 @@ class ProfileTab(QWidget):
         self.db = None
         self.copy_notification = CopyNotification(self)
         self.copy_notification.hide()
-        self.filtered_results = []
-
+        self.filter_thread = None
+        self._filter_generation = 0
+        self._shown_generation = 0
+        self._pending_query = None
+        self._active_query = None    # запрос, по которому построена таблица
+        self._live_pending = {}      # имена, сохранённые сканированием, ещё не показанные (порядок прихода)
+        self._loaded = False         # индекс, список бирж и таблица — при первом показе вкладки
+        self._refill_exchanges = False   # reset_filters: список бирж заново из счётчиков следующего результата
+        self._load_started = None
+
+        start = time.perf_counter()
         try:
             self.db = Database(profile_name)
         except Exception as e:
@@ -432,10 +709,24 @@ class ProfileTab(QWidget):
         self.apply_theme()
         self._build_star_icons_from_outline()  # подготовим иконки звезды (контур + заливка)
         self._load_metascalp_icons()
-        self.update_exchange_list()
-        self.reset_filters()
+        log_phase(f"профиль {profile_name}: БД и интерфейс", start)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._loaded:
+            # первый показ: сначала кадр вкладки, затем один запрос FilterThread
+            # строит индекс и отдаёт и биржи (для списка), и первую выборку
+            self._loaded = True
+            self._load_started = time.perf_counter()
+            QTimer.singleShot(0, self.apply_filter)
+            return
+        # пока вкладка была скрыта, другой профиль мог обновить общие монеты в каталоге
+        seen = getattr(self, '_catalog_seen', None)
+        if self.db is not None and seen is not None and seen != self.db.catalog_version:
+            self.apply_filter()
 
     def closeEvent(self, event):
+        self.stop_filter_thread()
         if hasattr(self, 'scan_thread') and getattr(self.scan_thread, 'isRunning', lambda: False)():
             try:
                 self.scan_thread.terminate()
@@ -536,7 +827,7 @@ class ProfileTab(QWidget):
                 background-color: #6A5AF9;
                 width: 10px;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #3A3A3A;
                 gridline-color: #444444;
                 color: #DDDDDD;
@@ -552,11 +843,11 @@ class ProfileTab(QWidget):
                 font-weight: bold;
                 font-size: 12px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 background-color: #3A3A3A;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #5A5A5A;
                 color: #DDDDDD;
             }
@@ -596,6 +887,14 @@ class ProfileTab(QWidget):
         self.load_file_btn.clicked.connect(self.load_file)
         self.coin_input.returnPressed.connect(self.start_scan)
 
+        # Подсказки монет из профиля — из индекса имён, без перебора всех монет
+        self.coin_completer_model = QStringListModel(self)
+        self.coin_completer = QCompleter(self.coin_completer_model, self)
+        self.coin_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.coin_completer.setMaxVisibleItems(12)
+        self.coin_input.setCompleter(self.coin_completer)
+        self.coin_input.textEdited.connect(self.update_coin_suggestions)
+
         input_layout.addWidget(self.coin_input, 5)
         input_layout.addWidget(self.scan_btn, 2)
         input_layout.addWidget(self.load_file_btn, 2)
@@ -720,6 +1019,15 @@ class ProfileTab(QWidget):
         self.coin_search_input.setPlaceholderText("Введите название монеты")
         self.coin_search_input.setMinimumHeight(36)
         self.coin_search_input.returnPressed.connect(self.apply_filter)
+        # фильтр по мере ввода: ждём паузу в наборе, сам подсчёт — в FilterThread
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self._filter_timer.timeout.connect(self.apply_filter)
+        self.coin_search_input.textChanged.connect(self._filter_timer.start)
+        self._live_timer = QTimer(self)
+        self._live_timer.setInterval(LIVE_UPDATE_MS)
+        self._live_timer.timeout.connect(self._apply_live_updates)
         filter_layout.addWidget(self.coin_search_input, 0, 1, 1, 4)
 
         filter_layout.addWidget(QLabel("Выберите биржи:"), 1, 0)
@@ -757,18 +1065,32 @@ class ProfileTab(QWidget):
         self.export_btn.clicked.connect(self.export_filtered_tickers)
         search_layout.addWidget(self.export_btn)
 
-        self.table = QTableWidget(0, 4)
-        self.table.setHorizontalHeaderLabels(["Монета", "Спотовые биржи", "Фьючерсные биржи", "sortKey"])
-        self.table.setColumnHidden(3, True)
-        self.table.setSortingEnabled(True)
-        self.table.sortItems(3, Qt.AscendingOrder)
+        # model/view: строки рисует делегат, виджетов на строку нет
+        self.coin_model = CoinTableModel(self)
+        self.coin_proxy = CoinSortProxy(self)
+        self.coin_proxy.setSourceModel(self.coin_model)
+        self.coin_delegate = CoinDelegate(self)
+        self.coin_delegate.set_metascalp_icons(self._icon_allowed, self._icon_deny)
+        if os.path.exists("icons/icon_copy.png"):
+            self.coin_delegate.set_copy_icon(QIcon("icons/icon_copy.png"))
+        self.coin_delegate.favoriteToggled.connect(self.toggle_favorite)
+        self.coin_delegate.copyRequested.connect(self.copy_coin_name_from_table)
+        self.coin_delegate.metascalpToggled.connect(self.coin_model.toggle_metascalp)
+
+        self.table = QTableView()
+        self.table.setModel(self.coin_proxy)
+        self.table.setItemDelegateForColumn(COL_COIN, self.coin_delegate)
+        self.table.setMouseTracking(True)  # подсветка кнопки копирования под курсором
+        # сортировка — только по клику на заголовок; до этого порядок фильтра (избранные сверху)
+        self.table.horizontalHeader().setSectionsClickable(True)
+        self.table.horizontalHeader().sectionClicked.connect(self._sort_by_header)
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
         self.table.setMinimumHeight(400)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)  # мультивыбор
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.verticalHeader().setVisible(False)
         self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table.verticalHeader().setDefaultSectionSize(40)
@@ -819,23 +1141,25 @@ class ProfileTab(QWidget):
         self._apply_metascalp_icon(btn, not state)
 
     def update_exchange_list(self):
-        exchanges = self.get_unique_exchanges()
-        self.exchange_filter.set_exchanges(exchanges)
+        """Биржи с числом монет из счётчиков индекса; выбор сохраняется. True — изменился набор бирж."""
+        if not self._loaded:
+            return False  # индекс ещё не строился — список заполнит первая выборка FilterThread
+        return self.exchange_filter.update_exchanges(self.db.exchange_index().exchange_counts())
+
+    def update_coin_suggestions(self, text):
+        query = text.strip().upper()
+        suggestions = []
+        if query and self.db is not None:
+            try:
+                suggestions = self.db.exchange_index().suggest(query, 20)
+            except Exception:
+                suggestions = []
+        self.coin_completer_model.setStringList(suggestions)
+        if suggestions:
+            self.coin_completer.complete()
 
     def get_unique_exchanges(self):
-        exchanges = set()
-        for coin in self.db.search_coins():
-            if coin.spot_exchanges:
-                for exchange in coin.spot_exchanges.split(','):
-                    exchange_name = exchange.strip()
-                    if exchange_name:
-                        exchanges.add(exchange_name)
-            if coin.futures_exchanges:
-                for exchange in coin.futures_exchanges.split(','):
-                    exchange_name = exchange.strip()
-                    if exchange_name:
-                        exchanges.add(exchange_name)
-        return sorted(exchanges) if exchanges else []
+        return self.db.exchange_index().exchanges()
 
     def start_scan(self):
         try:
@@ -866,6 +1190,7 @@ class ProfileTab(QWidget):
             self.batch_progress_bar.setVisible(False)
 
             thread_id = f"scan_{int(time.time())}_{id(self)}"
+            ensure_playwright()
             self.scan_thread = ParseThread(coin_name, thread_id)
             self.scan_thread.finished.connect(self.on_scan_finished)
             self.scan_thread.error.connect(self.on_scan_error)
@@ -898,6 +1223,24 @@ class ProfileTab(QWidget):
                 QMessageBox.warning(self, "Ошибка", "Файл пуст")
                 return
 
+            # файл из Freak Parser с историей запусков — можно сканировать только разницу
+            diff = ticker_snapshots.latest_diff(file_path)
+            if diff is not None:
+                reply = QMessageBox.question(
+                    self,
+                    "Изменения с прошлого запуска",
+                    f"С прошлого запуска парсера: новых {len(diff.added)}, исчезло {len(diff.removed)}.\n"
+                    f"Сканировать только новые тикеры?\n(Нет — весь файл, {len(coin_names)} шт.)",
+                    QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+                )
+                if reply == QMessageBox.Cancel:
+                    return
+                if reply == QMessageBox.Yes:
+                    coin_names = [name.strip().upper() for name in diff.added if name.strip()]
+                    if not coin_names:
+                        QMessageBox.information(self, "Информация", "Новых тикеров нет")
+                        return
+
             original_text = self.coin_input.text()
 
             self.scan_btn.setEnabled(False)
@@ -913,8 +1256,10 @@ class ProfileTab(QWidget):
             max_workers = min(5, max(2, coin_count // 20))
 
             thread_id = f"batch_{int(time.time())}_{id(self)}"
+            ensure_playwright()
             self.batch_thread = BatchParseThread(coin_names, self.db, thread_id, max_workers)
             self.batch_thread.progress.connect(self.on_batch_progress)
+            self.batch_thread.saved.connect(self.queue_live_update)
             self.batch_thread.finished.connect(self.on_batch_finished)
             self.batch_thread.error.connect(self.on_batch_error)
             self.batch_thread.start()
@@ -929,6 +1274,45 @@ class ProfileTab(QWidget):
             self.load_file_btn.setEnabled(True)
             self.stop_memory_cleanup()
 
+    def start_stream_scan(self):
+        """Конвейер из Freak Parser: потоковый батч без файла, тикеры докидываются через feed_stream_tickers."""
+        if hasattr(self, 'batch_thread') and self.batch_thread.isRunning():
+            if getattr(self.batch_thread, '_stream', False):
+                return True
+            QMessageBox.warning(self, "Ошибка", "Пакетное сканирование уже идёт")
+            return False
+
+        self.scan_btn.setEnabled(False)
+        self.load_file_btn.setEnabled(False)
+        self.progress_bar.setVisible(False)
+        self.batch_progress_bar.setVisible(True)
+        self.batch_progress_bar.setRange(0, 0)
+        self.batch_progress_bar.setFormat("Ожидание тикеров из скринера...")
+        self.cancel_btn.setVisible(True)
+
+        thread_id = f"stream_{int(time.time())}_{id(self)}"
+        ensure_playwright()
+        self.batch_thread = BatchParseThread([], self.db, thread_id, max_workers=5, stream=True)
+        self.batch_thread.progress.connect(self.on_batch_progress)
+        self.batch_thread.saved.connect(self.queue_live_update)
+        self.batch_thread.finished.connect(self.on_batch_finished)
+        self.batch_thread.error.connect(self.on_batch_error)
+        self.batch_thread.start()
+
+        self.start_memory_cleanup()
+        return True
+
+    def feed_stream_tickers(self, names):
+        thread = getattr(self, 'batch_thread', None)
+        if thread is None or not getattr(thread, '_stream', False) or not thread.isRunning():
+            return
+        thread.feed([n.strip().upper() for n in names if n and n.strip()])
+
+    def finish_stream_feed(self):
+        thread = getattr(self, 'batch_thread', None)
+        if thread is not None and getattr(thread, '_stream', False):
+            thread.close_feed()
+
     def on_scan_finished(self, data):
         try:
             self.progress_bar.setVisible(False)
@@ -949,12 +1333,8 @@ class ProfileTab(QWidget):
             # сохраняем в БД и подтягиваем признак избранного
             if hasattr(self, 'db') and self.db is not None:
                 self.db.save_coin(data['name'], spot_str, futures_str)
-                # прочитаем favorite для этой монеты
-                fav = False
-                for c in self.db.search_coins():
-                    if c.name == data['name']:
-                        fav = bool(c.favorite)
-                        break
+                # прочитаем favorite для этой монеты (точечно, по ключу)
+                fav = self.db.is_favorite(data['name'])
                 # синхронизируем кнопку⭐
                 self.single_star_btn.blockSignals(True)
                 self.single_star_btn.setChecked(fav)
@@ -987,6 +1367,8 @@ class ProfileTab(QWidget):
         QMessageBox.critical(self, "Ошибка сканирования", error_msg)
 
     def on_batch_progress(self, current, total, coin_name, remaining_time):
+        if self.batch_progress_bar.maximum() != total:
+            self.batch_progress_bar.setRange(0, total)  # в потоковом режиме total растёт
         self.batch_progress_bar.setValue(current)
         self.batch_progress_bar.setFormat(f"Сканирование: {coin_name} ({current}/{total}) - Осталось: {remaining_time}")
 
@@ -999,9 +1381,11 @@ class ProfileTab(QWidget):
 
         self.stop_memory_cleanup()
 
-        self.db.reload_from_file()
-        self.update_exchange_list()
-        self.reset_filters()
+        # таблица уже обновлялась по ходу сканирования — дописываем остаток, фильтры не трогаем;
+        # flush писателей и новые биржи — в FilterThread (_on_synced), GUI не ждёт
+        self._apply_live_updates()
+        if self._loaded:
+            self._ensure_filter_thread().request_sync()
 
         QMessageBox.information(self, "Успех", "Пакетное сканирование завершено!")
 
@@ -1018,6 +1402,9 @@ class ProfileTab(QWidget):
             self.stop_memory_cleanup()
 
     def apply_filter(self):
+        """Собрать параметры фильтра и отдать их FilterThread; результат придёт в _on_filter_ready."""
+        self._filter_timer.stop()
+        self._catalog_seen = self.db.catalog_version
         coin_name = self.coin_search_input.text().strip().upper()
         trade_type_text = self.trade_type.currentText()
         exclusive_mode = self.exclusive_check.isChecked()
@@ -1025,7 +1412,7 @@ class ProfileTab(QWidget):
 
         selected_exchanges = self.exchange_filter.get_selected_items()
         if not selected_exchanges:
-            selected_exchanges = self.get_unique_exchanges()
+            selected_exchanges = None  # все биржи профиля — FilterThread возьмёт их из индекса
 
         trade_type = {
             "Все": "all",
@@ -1033,173 +1420,136 @@ class ProfileTab(QWidget):
             "Только фьючерсы": "futures"
         }.get(trade_type_text, "all")
 
-        results = self.db.search_coins()
-        filtered_results = []
-
-        for coin in results:
-            if coin_name and coin_name not in coin.name:
-                continue
-
-            coin_spot_exchanges = []
-            if coin.spot_exchanges:
-                coin_spot_exchanges = [e.strip() for e in coin.spot_exchanges.split(',') if e.strip()]
-
-            coin_futures_exchanges = []
-            if coin.futures_exchanges:
-                coin_futures_exchanges = [e.strip() for e in coin.futures_exchanges.split(',') if e.strip()]
-
-            all_coin_exchanges = set(coin_spot_exchanges + coin_futures_exchanges)
-
-            if exclusive_mode:
-                found_on_all = True
-                for exchange in selected_exchanges:
-                    if trade_type == "all":
-                        if exchange not in coin_spot_exchanges and exchange not in coin_futures_exchanges:
-                            found_on_all = False
-                            break
-                    elif trade_type == "spot":
-                        if exchange not in coin_spot_exchanges:
-                            found_on_all = False
-                            break
-                    elif trade_type == "futures":
-                        if exchange not in coin_futures_exchanges:
-                            found_on_all = False
-                            break
-                if not found_on_all:
-                    continue
-                if not all_coin_exchanges.issubset(set(selected_exchanges)):
-                    continue
-            else:
-                found = False
-                for exchange in selected_exchanges:
-                    if trade_type == "all":
-                        if exchange in coin_spot_exchanges or exchange in coin_futures_exchanges:
-                            found = True
-                            break
-                    elif trade_type == "spot":
-                        if exchange in coin_spot_exchanges:
-                            found = True
-                            break
-                    elif trade_type == "futures":
-                        if exchange in coin_futures_exchanges:
-                            found = True
-                            break
-                if not found:
-                    continue
-
-            if trade_type == "spot" and not coin_spot_exchanges:
-                continue
-            if trade_type == "futures" and not coin_futures_exchanges:
-                continue
-
-            if favorites_only and not getattr(coin, 'favorite', False):
-                continue
-
-            filtered_results.append(coin)
-
-        # Избранные вверх, затем по имени
-        filtered_results.sort(key=lambda c: (not getattr(c, 'favorite', False), c.name))
-        self.filtered_results = filtered_results
+        # Битовый индекс бирж в памяти; избранные вверх, затем по имени
+        query = dict(
+            exchanges=selected_exchanges,
+            match="all" if exclusive_mode else "any",
+            market=trade_type,
+            only=exclusive_mode,
+            name_contains=coin_name,
+            favorites_only=bool(favorites_only),
+        )
+        self._filter_generation += 1
+        self._pending_query = query
+        self._ensure_filter_thread().submit(self._filter_generation, query)
+
+    def _ensure_filter_thread(self):
+        if self.filter_thread is None:
+            self.filter_thread = FilterThread(self.db)
+            self.filter_thread.ready.connect(self._on_filter_ready)
+            self.filter_thread.error.connect(self._on_filter_error)
+            self.filter_thread.synced.connect(self._on_synced)
+            self.filter_thread.start()
+        return self.filter_thread
+
+    def _on_synced(self, exchange_counts):
+        if self.exchange_filter.update_exchanges(exchange_counts):
+            self.apply_filter()  # появились новые биржи — активный запрос их ещё не знает
+
+    def _on_filter_ready(self, generation, filtered_results, exchange_counts):
+        if generation != self._filter_generation:
+            return  # пока считали, пришёл новый запрос
+        self._shown_generation = generation
+        self._active_query = self._pending_query
+        if self._load_started is not None or self._refill_exchanges:
+            self._refill_exchanges = False
+            self.exchange_filter.set_exchanges(exchange_counts)
+        # подмена целиком одним сбросом модели; таблица рисует только видимые строки
+        self.coin_proxy.reset_order()
+        self.table.horizontalHeader().setSortIndicatorShown(False)
+        self.coin_model.set_coins(filtered_results)
+        if self._load_started is not None:
+            log_phase(f"профиль {self.profile_name}: индекс, биржи и первая выборка ({len(filtered_results)})",
+                      self._load_started)
+            self._load_started = None
+
+    def _on_filter_error(self, generation, error_msg):
+        if generation == self._filter_generation:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось применить фильтр: {error_msg}")
+
+    def queue_live_update(self, names):
+        """Монеты, сохранённые сканированием: покажем их, не перестраивая таблицу (см. _apply_live_updates)."""
+        self._live_pending.update(dict.fromkeys(names))
+        if not self._live_timer.isActive():
+            self._live_timer.start()
+
+    def _apply_live_updates(self):
+        """
+        Шаг живого обновления: каждую монету проверяем активным фильтром и вставляем на её место
+        (или убираем, если больше не подходит). Не дольше LIVE_UPDATE_BUDGET_S за шаг.
+        """
+        if self._shown_generation != self._filter_generation:
+            return  # идёт перефильтрация: её результат может ещё не содержать этих монет
+        if self._active_query is None or not self._live_pending:
+            self._live_timer.stop()
+            return
+        index = self.db.exchange_index()
+        query = self._active_query
+        if query["exchanges"] is None:
+            query = dict(query, exchanges=index.exchanges())
+        deadline = time.perf_counter() + LIVE_UPDATE_BUDGET_S
+        while self._live_pending and time.perf_counter() < deadline:
+            names = list(itertools.islice(self._live_pending, LIVE_UPDATE_STEP))
+            for name in names:
+                del self._live_pending[name]
+            matched = index.matching(names, **query)
+            for coin in matched:
+                self.coin_model.add(coin)
+            keep = {coin.name for coin in matched}
+            self.coin_model.remove_names(n for n in names if n not in keep)
+        if not self._live_pending:
+            self._live_timer.stop()
+            if self.update_exchange_list():
+                self.apply_filter()
 
-        # Быстрый рефреш таблицы (без мерцаний)
-        self.table.setUpdatesEnabled(False)
-        self.table.setSortingEnabled(False)
-        try:
-            self.table.clearContents()
-            self.table.setRowCount(len(filtered_results))
-            for row_idx, coin in enumerate(filtered_results):
-                coin_widget = QWidget()
-                coin_layout = QHBoxLayout(coin_widget)
-                coin_layout.setContentsMargins(8, 0, 8, 0)
-                coin_layout.setSpacing(6)
-
-                # Кнопка-звезда слева
-                star_btn = QPushButton()
-                star_btn.setCheckable(True)
-                star_btn.setChecked(getattr(coin, 'favorite', False))
-                star_btn.setFixedSize(24, 24)
-                star_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: transparent;
-                        border: none;
-                        padding: 0px;
-                        margin: 0px;
-                    }
-                """)
-                star_btn.setIcon(self._star_icon_yellow if star_btn.isChecked() else self._star_icon_grey)
-                star_btn.setIconSize(QSize(18, 18))
-
-                def _on_star_toggled(checked, n=coin.name, btn=star_btn):
-                    self.toggle_favorite(n, checked)
-                    btn.setIcon(self._star_icon_yellow if checked else self._star_icon_grey)
-
-                star_btn.toggled.connect(_on_star_toggled)
-
-                coin_label = QLabel(coin.name)
-                coin_label.setObjectName("coin_name_label")  # <— чтобы надёжно находить строку
-                coin_label.setFont(QFont("Arial", 10, QFont.Bold))
-                coin_label.setStyleSheet("background-color: transparent;")
-                coin_label.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Preferred)
-
-                copy_btn = QPushButton()
-                copy_btn.setFixedSize(24, 24)
-                copy_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #6A5AF9;
-                        border: none;
-                        border-radius: 12px;
-                    }
-                    QPushButton:hover {
-                        background-color: #5B4AE9;
-                    }
-                """)
-                if os.path.exists("icons/icon_copy.png"):
-                    copy_btn.setIcon(QIcon("icons/icon_copy.png"))
-                    copy_btn.setIconSize(QSize(16, 16))
-                else:
-                    copy_btn.setText("C")
-                copy_btn.setToolTip("Копировать название")
-                copy_btn.clicked.connect(lambda _, name=coin.name: self.copy_coin_name_from_table(name))
-
-                coin_layout.addWidget(star_btn)
-                coin_layout.addWidget(coin_label)
-                coin_layout.addSpacing(8)
-                coin_layout.addWidget(copy_btn)
-
-                # ▼ новая плоская allow/deny-иконка без кружка
-                row_metascalp_btn = QPushButton()
-                row_metascalp_btn.setFixedSize(24, 24)
-                row_metascalp_btn.setCheckable(True)
-                self._apply_metascalp_icon(row_metascalp_btn, True)  # по умолчанию allowed.png
-                row_metascalp_btn.clicked.connect(self._toggle_metascalp)
-                coin_layout.addWidget(row_metascalp_btn)
-
-                coin_layout.addStretch()
-
-                self.table.setCellWidget(row_idx, 0, coin_widget)
-
-                spot_item = QTableWidgetItem(coin.spot_exchanges or "")
-                spot_item.setToolTip(coin.spot_exchanges or "")
-                self.table.setItem(row_idx, 1, spot_item)
-
-                futures_item = QTableWidgetItem(coin.futures_exchanges or "")
-                futures_item.setToolTip(coin.futures_exchanges or "")
-                self.table.setItem(row_idx, 2, futures_item)
-                sort_key = f"{0 if getattr(coin, 'favorite', False) else 1}_{coin.name}"
-                sort_item = QTableWidgetItem(sort_key)
-                sort_item.setFlags(Qt.ItemIsEnabled)  # не редактируется
-                self.table.setItem(row_idx, 3, sort_item)
-        finally:
-            self.table.setSortingEnabled(True)
-            self.table.sortItems(3, Qt.AscendingOrder)
-            self.table.setUpdatesEnabled(True)
+    def stop_filter_thread(self):
+        if self.filter_thread is not None:
+            self.filter_thread.stop()
+            self.filter_thread = None
+
+    def is_scanning(self):
+        thread = getattr(self, 'batch_thread', None)
+        return thread is not None and thread.isRunning()
+
+    def detach_batch_thread(self):
+        """Вкладку закрывают посреди скана: отменить его и отвязать от вкладки. Возвращает поток (или None)."""
+        if not self.is_scanning():
+            return None
+        thread = self.batch_thread
+        for signal in (thread.progress, thread.saved, thread.error, thread.finished):
+            try:
+                signal.disconnect()
+            except TypeError:  # не был подключён
+                pass
+        thread.cancel()
+        thread.close_feed()
+        del self.batch_thread
+        self.stop_memory_cleanup()
+        return thread
+
+    def _sort_by_header(self, section):
+        header = self.table.horizontalHeader()
+        order = Qt.AscendingOrder
+        if header.isSortIndicatorShown() and header.sortIndicatorSection() == section:
+            order = Qt.DescendingOrder if header.sortIndicatorOrder() == Qt.AscendingOrder else Qt.AscendingOrder
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(section, order)
+        self.coin_proxy.sort(section, order)
+
+    def _selected_names(self):
+        """Имена монет выделенных строк (в порядке таблицы)."""
+        rows = sorted(i.row() for i in self.table.selectionModel().selectedRows())
+        coins = (self.coin_model.coin(self.coin_proxy.source_row(r)) for r in rows)
+        return [c.name for c in coins if c is not None]
 
     def reset_filters(self):
         self.coin_search_input.clear()
         self.trade_type.setCurrentIndex(0)
         self.exclusive_check.setChecked(False)
         self.favorites_only_check.setChecked(False)
-        self.exchange_filter.set_exchanges(self.get_unique_exchanges())
+        # «все биржи»; список с числами монет заново заполнит _on_filter_ready (индекс — в FilterThread)
+        self.exchange_filter.clear_selection()
+        self._refill_exchanges = True
         self.apply_filter()
 
     def copy_coin_name(self, button):
@@ -1208,23 +1558,16 @@ class ProfileTab(QWidget):
             pyperclip.copy(f"{coin_name}USDT")
             self.copy_notification.show_notification(button)
 
-    def copy_coin_name_from_table(self, name):
+    def copy_coin_name_from_table(self, name, pos):
         pyperclip.copy(f"{name}USDT")
-        for i in range(self.table.rowCount()):
-            widget = self.table.cellWidget(i, 0)
-            if widget:
-                copy_btn = None
-                # найдём кнопку копирования внутри ячейки (второй QPushButton после звезды)
-                buttons = widget.findChildren(QPushButton)
-                if len(buttons) >= 2:
-                    copy_btn = buttons[1]
-                if copy_btn and copy_btn == self.sender():
-                    self.table.selectRow(i)
-                    self.copy_notification.show_notification(copy_btn)
-                    break
+        row = self._find_row_by_name(name)
+        if row is not None:
+            self.table.selectRow(row)
+        self.copy_notification.show_notification_at_pos(pos)
 
     def export_filtered_tickers(self):
-        if not hasattr(self, 'filtered_results') or not self.filtered_results:
+        tickers = [coin.name for coin in self.coin_model.coins()]
+        if not tickers:
             QMessageBox.warning(self, "Ошибка", "Нет отфильтрованных данных для экспорта")
             return
 
@@ -1236,8 +1579,8 @@ class ProfileTab(QWidget):
 
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
-                for coin in self.filtered_results:
-                    f.write(f"{coin.name}\n")
+                for name in tickers:
+                    f.write(f"{name}\n")
             QMessageBox.information(self, "Успех", f"Тикеры сохранены в файл: {file_path}")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при сохранении файла: {str(e)}")
@@ -1253,15 +1596,8 @@ class ProfileTab(QWidget):
             try:
                 if self.db.delete_coin(name):
                     self.update_exchange_list()
-                    # удалим строку из таблицы и кэша, без полной перерисовки
-                    row = self._find_row_by_name(name)
-                    if row is not None:
-                        self.table.setUpdatesEnabled(False)
-                        try:
-                            self.table.removeRow(row)
-                            self.filtered_results = [c for c in self.filtered_results if c.name != name]
-                        finally:
-                            self.table.setUpdatesEnabled(True)
+                    # удалим строку из модели, без полной перерисовки
+                    self.coin_model.remove_names([name])
                     QMessageBox.information(self, "Удалено", f"{name} удалён из базы.")
                 else:
                     QMessageBox.information(self, "Информация", f"{name} не найден в базе.")
@@ -1269,18 +1605,7 @@ class ProfileTab(QWidget):
                 QMessageBox.critical(self, "Ошибка", f"Не удалось удалить {name}: {str(e)}")
 
     def delete_selected_coins(self):
-        # собрать выбранные строки (уникальные индексы)
-        rows = sorted({i.row() for i in self.table.selectedIndexes()})
-        if not rows:
-            return
-        names = []
-        for r in rows:
-            w = self.table.cellWidget(r, 0)
-            if not w:
-                continue
-            lbl = w.findChild(QLabel, "coin_name_label")
-            if lbl:
-                names.append(lbl.text())
+        names = self._selected_names()
         if not names:
             return
         reply = QMessageBox.question(
@@ -1291,43 +1616,30 @@ class ProfileTab(QWidget):
         )
         if reply != QMessageBox.Yes:
             return
-        self.table.setUpdatesEnabled(False)
         try:
-            for name in names:
-                try:
-                    self.db.delete_coin(name)
-                except Exception:
-                    pass
-            # пересобрать таблицу
-            self.update_exchange_list()
-            self.apply_filter()
-        finally:
-            self.table.setUpdatesEnabled(True)
+            self.db.delete_coins(names)  # одной транзакцией
+        except Exception:
+            pass
+        self.update_exchange_list()
+        self.coin_model.remove_names(names)
         QMessageBox.information(self, "Готово", f"Удалено: {len(names)}")
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_C and (event.modifiers() & Qt.ControlModifier):
-            selected_items = self.table.selectedItems()
-            if selected_items:
-                row = selected_items[0].row()
-                if 0 <= row < len(self.filtered_results):
-                    coin_name = self.filtered_results[row].name
-                    pyperclip.copy(f"{coin_name}USDT")
-                    rect = self.table.visualItemRect(selected_items[0])
-                    pos = self.table.mapToGlobal(rect.topLeft())
-                    self.copy_notification.show_notification_at_pos(pos)
+            names = self._selected_names()
+            if names:
+                pyperclip.copy(f"{names[0]}USDT")
+                rect = self.table.visualRect(self.coin_proxy.index(self._find_row_by_name(names[0]), 0))
+                pos = self.table.viewport().mapToGlobal(rect.topLeft())
+                self.copy_notification.show_notification_at_pos(pos)
 
         elif event.key() == Qt.Key_Delete:
             # если выбрано много — удалим списком
-            if len({i.row() for i in self.table.selectedIndexes()}) > 1:
+            names = self._selected_names()
+            if len(names) > 1:
                 self.delete_selected_coins()
-            else:
-                selected_items = self.table.selectedItems()
-                if selected_items:
-                    row = selected_items[0].row()
-                    if 0 <= row < len(self.filtered_results):
-                        coin_name = self.filtered_results[row].name
-                        self.delete_coin_by_name(coin_name)
+            elif names:
+                self.delete_coin_by_name(names[0])
 
         super().keyPressEvent(event)
 
@@ -1339,45 +1651,19 @@ class ProfileTab(QWidget):
             if hasattr(self, 'db') and self.db:
                 self.db.set_favorite(name, is_favorite)
 
-            # 2) обновляем кэш
-            for c in self.filtered_results:
-                if c.name == name:
-                    c.favorite = bool(is_favorite)
-                    break
-
-            # 3) синхронизируем строку таблицы (иконка⭐, sort key)
-            row = self._find_row_by_name(name)
-
-            # фильтр «только избранное»
+            # 2) фильтр «только избранное»: снятая звезда — строка уходит, новая — перефильтровать
+            row = self.coin_model.row_of(name)
             if hasattr(self, 'favorites_only_check') and self.favorites_only_check.isChecked():
                 if not is_favorite and row is not None:
-                    self.table.removeRow(row)
-                    self.filtered_results = [c for c in self.filtered_results if c.name != name]
+                    self.coin_model.remove_names([name])
                     return
                 if is_favorite and row is None:
                     self.apply_filter()
                     return
 
+            # 3) строка модели: звезда + перенос на место «избранные сверху» (без перерисовки всего)
             if row is not None:
-                w = self.table.cellWidget(row, 0)
-                if w:
-                    for b in w.findChildren(QPushButton):
-                        if b.isCheckable():
-                            b.blockSignals(True)
-                            b.setChecked(is_favorite)
-                            b.setIcon(self._star_icon_yellow if is_favorite else self._star_icon_grey)
-                            b.blockSignals(False)
-                            break
-
-                key_item = self.table.item(row, 3)
-                if key_item is None:
-                    key_item = QTableWidgetItem()
-                    key_item.setFlags(Qt.ItemIsEnabled)
-                    self.table.setItem(row, 3, key_item)
-                key_item.setText(f"{0 if is_favorite else 1}_{name}")
-                self.table.sortItems(3, Qt.AscendingOrder)
-            else:
-                self.apply_filter()
+                self.coin_model.set_favorite(name, is_favorite)
 
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", f"Не удалось изменить избранное для {name}: {str(e)}")
@@ -1398,14 +1684,9 @@ class ProfileTab(QWidget):
             self.single_star_btn.blockSignals(False)
 
     def _find_row_by_name(self, name: str):
-        for i in range(self.table.rowCount()):
-            w = self.table.cellWidget(i, 0)
-            if not w:
-                continue
-            lbl = w.findChild(QLabel, "coin_name_label")
-            if lbl and lbl.text() == name:
-                return i
-        return None
+        """Строка таблицы (с учётом сортировки прокси) или None."""
+        row = self.coin_model.row_of(name)
+        return self.coin_proxy.proxy_row(row) if row is not None else None
 
     # ------- ИКОНКИ ЗВЕЗДЫ: контур + заливка -------
 
@@ -1415,6 +1696,8 @@ class ProfileTab(QWidget):
         if base.isNull():
             self._star_icon_grey = QIcon()
             self._star_icon_yellow = QIcon()
+            if hasattr(self, 'coin_delegate'):
+                self.coin_delegate.set_star_icons(self._star_icon_yellow, self._star_icon_grey)
             return
 
         # серая — просто окрашенный контур
@@ -1432,6 +1715,8 @@ class ProfileTab(QWidget):
         painter.end()
 
         self._star_icon_yellow = QIcon(filled)
+        if hasattr(self, 'coin_delegate'):
+            self.coin_delegate.set_star_icons(self._star_icon_yellow, self._star_icon_grey)
 
     def _tinted_pixmap(self, pix: QPixmap, color: QColor) -> QPixmap:
         result = QPixmap(pix.size())
@@ -1479,6 +1764,7 @@ class CryptoApp(QMainWindow):
         self.renaming_tab_index = -1
         self.rename_edit = None
         self.is_renaming = False
+        self._closing_scans = []  # сканы закрытых вкладок: база профиля закрывается, когда поток выйдет
 
         self.init_ui()
         self.apply_theme()
@@ -1540,7 +1826,7 @@ class CryptoApp(QMainWindow):
 
         self.copy_profile_btn = QPushButton("⎘")
         self.copy_profile_btn.setFixedSize(36, 36)
-        self.copy_profile_btn.setToolTip("Копировать текущий профиль")
+        self.copy_profile_btn.setToolTip("Копировать текущий профиль (ПКМ — экспорт / снимок)")
         self.copy_profile_btn.setStyleSheet("""
             QPushButton {
                 background-color: #444444;
@@ -1555,6 +1841,8 @@ class CryptoApp(QMainWindow):
             }
         """)
         self.copy_profile_btn.clicked.connect(self.copy_current_profile)
+        self.copy_profile_btn.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.copy_profile_btn.customContextMenuRequested.connect(self.show_profile_backup_menu)
 
         self.delete_profile_btn = QPushButton("✕")
         self.delete_profile_btn.setFixedSize(36, 36)
@@ -1712,19 +2000,50 @@ class CryptoApp(QMainWindow):
 
         if not hasattr(self, 'freak_parser_window') or self.freak_parser_window is None:
             try:
+                ensure_playwright()
                 from freak_parser import TradingViewParserGUI
                 self.freak_parser_window = TradingViewParserGUI()
                 self.freak_parser_window.finished.connect(lambda: setattr(self, 'freak_parser_window', None))
+                self.freak_parser_window.stream_started.connect(self._on_freak_stream_started)
+                self.freak_parser_window.tickers_found.connect(self._on_freak_tickers_found)
+                self.freak_parser_window.stream_finished.connect(self._on_freak_stream_finished)
                 self.freak_parser_window.show()
             except Exception as e:
                 print(f"Ошибка при открытии Freak Parser: {e}")
                 self.freak_parser_window = None
 
+    # --- конвейер Freak Parser → сканер текущего профиля ---
+    def _on_freak_stream_started(self):
+        tab = self.tab_widget.currentWidget()
+        self._stream_target = tab if isinstance(tab, ProfileTab) and tab.start_stream_scan() else None
+        if self._stream_target is None:
+            QMessageBox.warning(self, "Конвейер", "Нет открытого профиля — тикеры будут только сохранены в TXT")
+
+    def _on_freak_tickers_found(self, names):
+        tab = getattr(self, '_stream_target', None)
+        if tab is None:
+            return
+        try:
+            tab.feed_stream_tickers(names)
+        except RuntimeError:  # вкладку закрыли во время конвейера
+            self._stream_target = None
+
+    def _on_freak_stream_finished(self):
+        tab = getattr(self, '_stream_target', None)
+        self._stream_target = None
+        if tab is None:
+            return
+        try:
+            tab.finish_stream_feed()
+        except RuntimeError:
+            pass
+
     def open_clicker(self):
         global CLICKER_OPENED
         if CLICKER_OPENED:
             QMessageBox.information(self, "Информация", "Кликер уже открыт!")
             return
+        from clicker_window import ClickerWindow
         self.clicker_window = ClickerWindow()
         self.clicker_window.show()
         CLICKER_OPENED = True
@@ -1781,6 +2100,13 @@ class CryptoApp(QMainWindow):
                 self.start_rename_tab(index)
                 return True
 
+        if event.type() == QEvent.ToolTip and source is self.tab_widget.tabBar():
+            widget = self.tab_widget.widget(source.tabAt(event.pos()))
+            db = getattr(widget, 'db', None)
+            if db is not None:
+                QToolTip.showText(event.globalPos(), self.maintenance_tooltip(db), source)
+                return True
+
         if (self.is_renaming and event.type() == QEvent.MouseButtonPress and source is not self.rename_edit):
             self.finish_rename_tab()
             return True
@@ -1795,6 +2121,23 @@ class CryptoApp(QMainWindow):
 
         return super().eventFilter(source, event)
 
+    @staticmethod
+    def maintenance_tooltip(db):
+        """WAL профиля и общего каталога: размер и последний чекпоинт."""
+        titles = {"profile": "Профиль", "catalog": "Каталог"}
+        lines = []
+        try:
+            for key, st in db.maintenance_stats().items():
+                line = f"{titles.get(key, key)}: WAL {st.wal_bytes / 1048576:.1f} МБ"
+                if st.checkpoints:
+                    line += f", checkpoint {st.last_mode} {st.last_ms:.0f} мс (макс. {st.max_ms:.0f} мс)"
+                if st.vacuumed_pages:
+                    line += f", vacuum {st.vacuumed_pages} стр."
+                lines.append(line)
+        except Exception:
+            pass
+        return "\n".join(lines) or db.profile_name
+
     def start_rename_tab(self, index):
         if self.rename_edit:
             self.finish_rename_tab()
@@ -1838,12 +2181,18 @@ class CryptoApp(QMainWindow):
                         unique = False
                         break
 
+                tab = self.tab_widget.widget(self.renaming_tab_index)
+                if unique and tab.is_scanning():
+                    QMessageBox.warning(self, "Ошибка", "Дождитесь окончания сканирования профиля")
+                    unique = False
+
                 if unique:
                     self.tab_widget.setTabText(self.renaming_tab_index, new_name)
                     try:
-                        tab = self.tab_widget.widget(self.renaming_tab_index)
                         if hasattr(tab, 'db'):
                             try:
+                                # rename_profile переоткрывает соединения — фоновый фильтр не должен читать через них
+                                tab.stop_filter_thread()
                                 tab.db.rename_profile(new_name)
                                 tab.profile_name = new_name
                             except Exception as e:
@@ -1932,6 +2281,7 @@ class CryptoApp(QMainWindow):
 
         db = Database(name)
         db.save()
+        db.close()
         self.add_profile_tab(name)
 
     def copy_current_profile(self):
@@ -1952,9 +2302,59 @@ class CryptoApp(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", "Профиль с таким именем уже открыт!")
                 return
 
-        current_db = Database(current_name)
-        new_db = current_db.copy_profile(new_name)
-        self.add_profile_tab(new_name)
+        # копируем через уже открытый профиль вкладки — у файла один писатель
+        current_db = self.tab_widget.widget(current_index).db
+        self.start_profile_backup(current_db, "copy", new_name, "Копирование профиля...",
+                                  lambda path: self.add_profile_tab(new_name))
+
+    def show_profile_backup_menu(self, pos):
+        current_index = self.tab_widget.currentIndex()
+        if current_index < 0:
+            return
+        db = getattr(self.tab_widget.widget(current_index), "db", None)
+        if db is None:
+            return
+        menu = QMenu(self)
+        export_action = menu.addAction("💾 Экспортировать профиль в файл...")
+        snapshot_action = menu.addAction("📸 Сделать снимок профиля")
+        action = menu.exec_(self.copy_profile_btn.mapToGlobal(pos))
+        if action == export_action:
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "Экспорт профиля", f"{db.profile_name}.db", "SQLite (*.db)"
+            )
+            if file_path:
+                self.start_profile_backup(db, "export", file_path, "Экспорт профиля...",
+                                          lambda path: QMessageBox.information(self, "Успех", f"Профиль сохранён: {path}"))
+        elif action == snapshot_action:
+            self.start_profile_backup(db, "snapshot", None, "Снимок профиля...",
+                                      lambda path: QMessageBox.information(self, "Успех", f"Снимок сохранён: {path}"))
+
+    def start_profile_backup(self, db, mode, target, title, on_done):
+        if getattr(self, "backup_thread", None) is not None and self.backup_thread.isRunning():
+            QMessageBox.warning(self, "Ошибка", "Копирование профиля уже выполняется")
+            return
+        dialog = QProgressDialog(title, None, 0, 100, self)
+        dialog.setWindowTitle("Профиль")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.setAutoClose(True)
+
+        def _on_progress(done, total):
+            dialog.setValue(int(done * 100 / total) if total else 100)
+
+        def _on_finished(path):
+            dialog.setValue(100)
+            on_done(path)
+
+        def _on_error(msg):
+            dialog.close()
+            QMessageBox.warning(self, "Ошибка", f"Не удалось скопировать профиль: {msg}")
+
+        self.backup_thread = ProfileBackupThread(db, mode, target)
+        self.backup_thread.progress.connect(_on_progress)
+        self.backup_thread.finished.connect(_on_finished)
+        self.backup_thread.error.connect(_on_error)
+        self.backup_thread.start()
 
     def delete_current_profile(self):
         current_index = self.tab_widget.currentIndex()
@@ -1975,7 +2375,8 @@ class CryptoApp(QMainWindow):
             return
 
         try:
-            db = Database(profile_name)
+            self.tab_widget.widget(current_index).stop_filter_thread()
+            db = self.tab_widget.widget(current_index).db or Database(profile_name)
             db.delete_profile()
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", f"Не удалось удалить файл профиля: {str(e)}")
@@ -1986,9 +2387,30 @@ class CryptoApp(QMainWindow):
 
     def close_tab(self, index):
         widget = self.tab_widget.widget(index)
+        widget.stop_filter_thread()
+        db = getattr(widget, "db", None)
+        thread = widget.detach_batch_thread()
+        if thread is not None:
+            # скан ещё пишет в профиль: отменён, базу закроем, когда поток выйдет
+            self._closing_scans.append((thread, db))
+            thread.finished.connect(lambda: self._on_closing_scan_finished(thread))
+        elif db is not None:
+            db.close()  # дописать очередь записи и отпустить файл
         widget.deleteLater()
         self.tab_widget.removeTab(index)
 
+    def _on_closing_scan_finished(self, thread, timeout=None):
+        for entry in self._closing_scans:
+            if entry[0] is thread:
+                self._closing_scans.remove(entry)
+                if timeout is None:
+                    thread.wait()
+                else:
+                    thread.wait(timeout)
+                if entry[1] is not None:
+                    entry[1].close()
+                return
+
     def toggle_always_on_top(self, checked):
         self.always_on_top = checked
         self.setWindowFlag(Qt.WindowStaysOnTopHint, checked)
@@ -2017,9 +2439,55 @@ class CryptoApp(QMainWindow):
             """)
 
     def closeEvent(self, event):
+        for thread, _ in list(self._closing_scans):
+            self._on_closing_scan_finished(thread, timeout=1000)
+        # писатели БД — daemon-потоки: дописываем очереди до выхода
+        for i in range(self.tab_widget.count()):
+            self.tab_widget.widget(i).stop_filter_thread()
+            db = getattr(self.tab_widget.widget(i), "db", None)
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+        # тёплая CDP-сессия Freak Parser: гасим Chrome, если запускали его сами (модуль грузится лениво)
+        freak_parser = sys.modules.get("freak_parser")
+        if freak_parser is not None:
+            try:
+                freak_parser.CDPSession.close()
+            except Exception:
+                pass
         super().closeEvent(event)
 
 
+def profile_startup(top=15):
+    """
+    --startup-profile: холодный старт в отдельном процессе под `python -X importtime` (выход после первого окна).
+    Печатает самые дорогие импорты верхнего уровня и фазы запуска из лога Startup.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--startup-exit"],
+                         capture_output=True, text=True, encoding="utf-8", errors="replace")
+    imports, phases = [], []
+    for line in out.stderr.splitlines():
+        if line.startswith("import time:"):
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit() and not parts[2].startswith("  "):
+                imports.append((int(parts[1]), parts[2].strip()))   # cumulative мкс, модуль верхнего уровня
+        elif " - Startup - " in line:
+            phases.append(line.split(" - INFO - ", 1)[-1])
+    if not phases:
+        print(out.stderr[-2000:])
+        return 1
+    print(f"Импорт (верхний уровень, включая вложенные), топ-{top}:")
+    for cumulative, name in sorted(imports, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} мс  {name}")
+    print(f"  {sum(c for c, _ in imports) / 1000:8.1f} мс  всего")
+    print("\nФазы запуска:")
+    for phase in phases:
+        print(f"  {phase}")
+    return 0
+
+
 if __name__ == "__main__":
     import multiprocessing as mp
     mp.freeze_support()
@@ -2031,15 +2499,19 @@ if __name__ == "__main__":
 
         coin_name = sys.argv[2]
         try:
+            from parser import parse_coin_in_process
             result = parse_coin_in_process(coin_name, headless=True)
             print(json.dumps(result))
         except Exception as e:
             print(json.dumps({"error": str(e), "coin": coin_name}))
         sys.exit(0)
 
-    if not setup_playwright():
-        print("Не удалось настроить Playwright. Приложение может работать некорректно.")
+    if "--startup-profile" in sys.argv:
+        sys.exit(profile_startup())
+    startup_exit = "--startup-exit" in sys.argv   # для --startup-profile: выйти после первого окна
 
+    log_phase("импорт модулей", STARTUP_T0)
+    start = time.perf_counter()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
 
@@ -2057,6 +2529,15 @@ if __name__ == "__main__":
         }
     """)
 
+    log_phase("QApplication", start)
+
+    start = time.perf_counter()
     window = CryptoApp()
+    log_phase("CryptoApp", start)
     window.show()
+    QTimer.singleShot(0, lambda: log_phase("первое окно (от запуска)", STARTUP_T0))
+    if startup_exit:
+        QTimer.singleShot(0, lambda: startup_log.info("загружено при старте из отложенных: %s",
+                                                      ", ".join(m for m in STARTUP_LAZY_MODULES if m in sys.modules) or "ничего"))
+        QTimer.singleShot(0, app.quit)
     sys.exit(app.exec_())
@@ -0,0 +1,103 @@
+# name_index.py
+# Поиск монет по подстроке и префиксу имени без перебора всех монет.
+#   - все подстроки длиной 1..3 -> множества имён (запросы до 3 символов — один lookup);
+#     длинный запрос = пересечение его триграмм + точная проверка кандидатов;
+#   - отсортированный список имён -> префиксы через bisect.
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Set
+
+GRAM = 3
+
+
+def _grams(name: str) -> Set[str]:
+    return {name[i:i + k] for k in range(1, GRAM + 1) for i in range(len(name) - k + 1)}
+
+
+class NameIndex:
+    def __init__(self, names: Iterable[str] = ()):
+        self._postings: Dict[str, Set[str]] = {}
+        self._names: Set[str] = set()
+        self._sorted: List[str] = []
+        for name in names:
+            self._add(name)
+        self._sorted = sorted(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def _add(self, name: str):
+        if name in self._names:
+            return False
+        self._names.add(name)
+        for g in _grams(name):
+            self._postings.setdefault(g, set()).add(name)
+        return True
+
+    def add(self, name: str):
+        if self._add(name):
+            insort(self._sorted, name)
+
+    def remove(self, name: str):
+        if name not in self._names:
+            return
+        self._names.discard(name)
+        for g in _grams(name):
+            bucket = self._postings.get(g)
+            if bucket is not None:
+                bucket.discard(name)
+                if not bucket:
+                    del self._postings[g]
+        i = bisect_left(self._sorted, name)
+        if i < len(self._sorted) and self._sorted[i] == name:
+            del self._sorted[i]
+
+    def contains(self, query: str) -> Set[str]:
+        """Имена, содержащие query (регистр как есть). Возвращает новое множество."""
+        if not query:
+            return set(self._names)
+        if len(query) <= GRAM:
+            return set(self._postings.get(query, ()))
+        buckets = []
+        for i in range(len(query) - GRAM + 1):
+            bucket = self._postings.get(query[i:i + GRAM])
+            if not bucket:
+                return set()
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        candidates = set(buckets[0])
+        for bucket in buckets[1:]:
+            candidates &= bucket
+            if not candidates:
+                break
+        return {n for n in candidates if query in n}
+
+    def estimate(self, query: str) -> int:
+        """Верхняя оценка числа имён с подстрокой query — по размерам posting-списков, без пересечения."""
+        if not query:
+            return len(self._names)
+        if len(query) <= GRAM:
+            return len(self._postings.get(query, ()))
+        return min(len(self._postings.get(query[i:i + GRAM], ())) for i in range(len(query) - GRAM + 1))
+
+    def prefix(self, query: str, limit: int = None) -> List[str]:
+        """Имена, начинающиеся с query, по алфавиту."""
+        i = bisect_left(self._sorted, query)
+        out = []
+        while i < len(self._sorted) and self._sorted[i].startswith(query):
+            out.append(self._sorted[i])
+            if limit is not None and len(out) >= limit:
+                break
+            i += 1
+        return out
+
+    def suggest(self, query: str, limit: int = 20) -> List[str]:
+        """Подсказки для ввода: сначала совпадения по префиксу, затем по подстроке (короткие выше)."""
+        if not query:
+            return []
+        out = self.prefix(query, limit)
+        if len(out) < limit:
+            seen = set(out)
+            rest = sorted((n for n in self.contains(query) if n not in seen), key=lambda n: (len(n), n))
+            out.extend(rest[:limit - len(out)])
+        return out
@@ -0,0 +1,110 @@
+# ticker_snapshots.py
+# Версии списков тикеров из Freak Parser: каждый запуск сохраняет снапшот,
+# а сканер может взять только разницу с прошлым запуском (новые тикеры).
+#
+#   Tickers/tickers.txt                          <- как раньше, перезаписывается
+#   Tickers/.snapshots/tickers/20250101_120000.txt
+#   Tickers/.snapshots/tickers/20250102_120000.txt
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+SNAPSHOTS_DIRNAME = ".snapshots"
+SNAPSHOTS_KEEP = 30
+
+
+@dataclass
+class TickerDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    previous: Optional[str] = None   # путь к прошлому снапшоту (None — это первый запуск)
+    current: Optional[str] = None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous is not None
+
+
+def _snapshot_dir(tickers_path: str) -> str:
+    folder = os.path.dirname(os.path.abspath(tickers_path))
+    stem = os.path.splitext(os.path.basename(tickers_path))[0]
+    return os.path.join(folder, SNAPSHOTS_DIRNAME, stem)
+
+
+def _read(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def list_snapshots(tickers_path: str) -> List[str]:
+    """Снапшоты файла тикеров от старых к новым."""
+    folder = _snapshot_dir(tickers_path)
+    if not os.path.isdir(folder):
+        return []
+    names = sorted(n for n in os.listdir(folder) if n.endswith(".txt"))
+    return [os.path.join(folder, n) for n in names]
+
+
+def diff_tickers(old: List[str], new: List[str]) -> TickerDiff:
+    old_set, new_set = set(old), set(new)
+    return TickerDiff(
+        added=[t for t in dict.fromkeys(new) if t not in old_set],
+        removed=[t for t in dict.fromkeys(old) if t not in new_set],
+    )
+
+
+def save_snapshot(tickers_path: str, tickers: List[str]) -> TickerDiff:
+    """Сохраняет новую версию списка и возвращает разницу с предыдущей."""
+    folder = _snapshot_dir(tickers_path)
+    os.makedirs(folder, exist_ok=True)
+    existing = list_snapshots(tickers_path)
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    current = os.path.join(folder, f"{stamp}.txt")
+    n = 1
+    while current in existing or os.path.exists(current):
+        current = os.path.join(folder, f"{stamp}_{n}.txt")
+        n += 1
+
+    tickers = [t.strip() for t in tickers if t and t.strip()]
+    tmp = current + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for t in tickers:
+            f.write(t + "\n")
+    os.replace(tmp, current)
+
+    if existing:
+        diff = diff_tickers(_read(existing[-1]), tickers)
+        diff.previous = existing[-1]
+    else:
+        diff = TickerDiff(added=list(dict.fromkeys(tickers)))
+    diff.current = current
+
+    # старые версии не копим бесконечно
+    for old in (existing + [current])[:-SNAPSHOTS_KEEP]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return diff
+
+
+def latest_diff(tickers_path: str) -> Optional[TickerDiff]:
+    """
+    Разница между двумя последними снапшотами — только если файл не правили руками
+    после парсера (содержимое совпадает с последним снапшотом). Иначе None.
+    """
+    snaps = list_snapshots(tickers_path)
+    if len(snaps) < 2 or not os.path.exists(tickers_path):
+        return None
+    try:
+        current = _read(snaps[-1])
+        if _read(tickers_path) != current:
+            return None
+        diff = diff_tickers(_read(snaps[-2]), current)
+    except OSError:
+        return None
+    diff.previous, diff.current = snaps[-2], snaps[-1]
+    return diff